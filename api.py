@@ -1,9 +1,19 @@
-from fastapi import FastAPI
+import asyncio
+import os
+from fastapi import FastAPI, Response, Depends, HTTPException
+from fastapi.responses import PlainTextResponse, FileResponse
 from fastapi.middleware.cors import CORSMiddleware
-from routes import cognitive, users, emotions
+from routes import cognitive, users, emotions, dashboard
+from routes.users import require_admin
 from db.mongo import db_connection 
+from db.indexes import ensure_indexes
+from services.json_response import FastJSONResponse
+from services.inference_executor import inference_executor
+from services.metrics import MetricsMiddleware, render_metrics
+from services.request_timing import RequestTimingMiddleware
+from services.profiler import profile_path
 
-app = FastAPI()
+app = FastAPI(default_response_class=FastJSONResponse)
 
 # Allow requests from your frontend
 origins = [
@@ -18,22 +28,68 @@ app.add_middleware(
     allow_methods=["*"],  # Allow all HTTP methods
     allow_headers=["*"],  # Allow all headers
 )
+# Server-Timing header and on-demand profiling (X-Profile: 1 / ?profile=1, admins only)
+app.add_middleware(RequestTimingMiddleware)
+# Outermost, so latency covers CORS handling too
+app.add_middleware(MetricsMiddleware)
 
 # Include route modules
 app.include_router(cognitive.router, prefix="/api", tags=["Cognitive"])
 app.include_router(emotions.router, prefix="/api", tags=["Emotion"])
 app.include_router(users.router, prefix="/api/users", tags=["Authorization"])
+app.include_router(dashboard.router, prefix="/api", tags=["Dashboard"])
 
 # Database connection
 @app.on_event("startup")
 async def startup_db_client():
-    await db_connection.connect()
+    db = await db_connection.connect()
+    if os.getenv("MONGO_ENSURE_INDEXES", "true").lower() in ("1", "true", "yes"):
+        await ensure_indexes(db)
+    inference_executor.start()
+    await emotions.emotion_jobs.start()
+    if emotions.LOAD_ON_STARTUP:
+        # Load in the background so /test answers while the model is still loading
+        app.state.model_loader = asyncio.create_task(emotions.ensure_model_loaded())
 
 @app.on_event("shutdown")
 async def shutdown_db_client():
+    await emotions.emotion_jobs.stop()
     await db_connection.disconnect()
+    inference_executor.shutdown()
+    if emotions.batch_scheduler is not None:
+        emotions.batch_scheduler.stop()
 
 # Health check endpoint
 @app.get("/test")
 async def test_server():
     return {"message": "Server is running!"}
+
+# Readiness check: model, cascade and database must all be usable
+@app.get("/ready")
+async def readiness_check(response: Response):
+    checks = {
+        "model": emotions.emotion_model is not None,
+        "cascade": emotions.face_cascade is not None and not emotions.face_cascade.empty(),
+        "database": await db_connection.ping(),
+    }
+    ready = all(checks.values())
+    if not ready:
+        response.status_code = 503
+    return {
+        "ready": ready,
+        "checks": checks,
+        "startup": emotions.lifecycle_stats,
+    }
+
+# Prometheus scrape endpoint
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
+# Download a request profile captured with X-Profile: 1 (collapsed stacks, open with speedscope or flamegraph.pl)
+@app.get("/api/profiles/{profile_id}")
+async def download_profile(profile_id: str, admin: dict = Depends(require_admin)):
+    path = profile_path(profile_id)
+    if path is None or not os.path.exists(path):
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return FileResponse(path, media_type="text/plain", filename=f"{profile_id}.folded")
@@ -0,0 +1,139 @@
+"""Index definitions for every collection the app queries, and a query-plan check.
+
+    python -m db.indexes            create any missing indexes
+    python -m db.indexes --check    create them, then explain() every query shape the
+                                    routes use and exit non-zero on a COLLSCAN or in-memory SORT
+"""
+import argparse
+import asyncio
+import sys
+from datetime import datetime
+
+from bson import ObjectId
+from pymongo import ASCENDING, DESCENDING
+from pymongo.errors import OperationFailure
+
+from db.mongo import DatabaseConnection
+from services.result_cache import RESULT_CACHE_COLLECTION, RESULT_CACHE_TTL_SECONDS
+
+# collection -> list of (keys, options)
+INDEXES = {
+    "users": [
+        ([("email", ASCENDING)], {"unique": True, "name": "email_unique"}),
+        ([("username", ASCENDING)], {"unique": True, "name": "username_unique"}),
+    ],
+    "test_data": [
+        ([("test_type", ASCENDING)], {"name": "test_type"}),
+    ],
+    "cognitive_test_results": [
+        ([("user_id", ASCENDING), ("test_type", ASCENDING), ("submitted_at", DESCENDING)], {"name": "user_type_submitted"}),
+        ([("user_id", ASCENDING), ("submitted_at", DESCENDING)], {"name": "user_submitted"}),
+        ([("scoring_version", ASCENDING)], {"name": "scoring_version"}),
+    ],
+    "emotion_analyses": [
+        ([("user_id", ASCENDING), ("timestamp", DESCENDING), ("_id", DESCENDING)], {"name": "user_timestamp_id"}),
+    ],
+    "emotion_rollups": [
+        ([("user_id", ASCENDING), ("period", ASCENDING), ("bucket_start", DESCENDING)], {"name": "user_period_bucket"}),
+    ],
+    "emotion_jobs": [
+        ([("status", ASCENDING), ("created_at", ASCENDING)], {"name": "status_created"}),
+        ([("status", ASCENDING), ("updated_at", ASCENDING)], {"name": "status_updated"}),
+        ([("user_id", ASCENDING)], {"name": "user_id"}),
+    ],
+    RESULT_CACHE_COLLECTION: [
+        ([("created_at", ASCENDING)], {"expireAfterSeconds": RESULT_CACHE_TTL_SECONDS, "name": "created_at_ttl"}),
+    ],
+}
+
+# Every query shape issued by the routes: (collection, filter, sort)
+_sample_id = ObjectId()
+QUERY_SHAPES = [
+    ("users", {"email": "someone@example.com"}, None),
+    ("users", {"username": "someone"}, None),
+    ("users", {"$or": [{"email": "someone@example.com"}, {"username": "someone"}]}, None),
+    ("users", {"_id": _sample_id}, None),
+    # resolve_students (bulk submissions)
+    ("users", {"email": {"$in": ["someone@example.com", "other@example.com"]}}, None),
+    ("users", {"_id": {"$in": [_sample_id, ObjectId()]}}, None),
+    ("test_data", {"test_type": "Cognitive Assessment"}, None),
+    ("cognitive_test_results", {"user_id": _sample_id, "test_type": "Cognitive Assessment"}, None),
+    ("cognitive_test_results", {"user_id": _sample_id}, [("submitted_at", DESCENDING)]),
+    ("emotion_analyses", {"user_id": str(_sample_id)}, None),
+    ("emotion_analyses", {"user_id": str(_sample_id)}, [("timestamp", DESCENDING)]),
+    ("emotion_analyses", {"user_id": str(_sample_id)}, [("timestamp", DESCENDING), ("_id", DESCENDING)]),
+    ("emotion_analyses", {"user_id": str(_sample_id), "$or": [
+        {"timestamp": {"$lt": datetime.utcnow()}},
+        {"timestamp": datetime.utcnow(), "_id": {"$lt": _sample_id}},
+    ]}, [("timestamp", DESCENDING), ("_id", DESCENDING)]),
+    ("emotion_rollups", {"user_id": str(_sample_id), "period": "day"}, [("bucket_start", DESCENDING)]),
+    ("emotion_jobs", {"_id": _sample_id, "user_id": str(_sample_id)}, None),
+    ("emotion_jobs", {"status": "queued"}, [("created_at", ASCENDING)]),
+    ("emotion_jobs", {"status": "running", "updated_at": {"$lt": datetime.utcnow()}}, None),
+]
+
+BAD_STAGES = ("COLLSCAN", "SORT")
+
+
+async def ensure_indexes(db):
+    """Create all indexes in INDEXES; existing ones are left untouched."""
+    for collection_name, indexes in INDEXES.items():
+        for keys, options in indexes:
+            try:
+                await db[collection_name].create_index(keys, **options)
+            except OperationFailure as e:
+                # e.g. duplicates blocking a unique index; keep serving and report it
+                print(f"❌ Could not create index {options.get('name')} on {collection_name}: {e}")
+    print("✅ MongoDB indexes ensured")
+
+
+def _plan_stages(plan):
+    """Yield every stage name in a (possibly nested) query plan."""
+    if isinstance(plan, dict):
+        if "stage" in plan:
+            yield plan["stage"]
+        for value in plan.values():
+            yield from _plan_stages(value)
+    elif isinstance(plan, list):
+        for item in plan:
+            yield from _plan_stages(item)
+
+
+async def check_query_plans(db):
+    """Explain every query shape; returns a list of (collection, filter, sort, bad stages)."""
+    problems = []
+    for collection_name, query, sort in QUERY_SHAPES:
+        cursor = db[collection_name].find(query)
+        if sort:
+            cursor = cursor.sort(sort)
+        explain = await cursor.limit(1).explain()
+        stages = set(_plan_stages(explain["queryPlanner"]["winningPlan"]))
+        bad = sorted(stages.intersection(BAD_STAGES))
+        status = "FAIL" if bad else "ok"
+        print(f"[{status}] {collection_name} {query} sort={sort}: {', '.join(sorted(stages))}")
+        if bad:
+            problems.append((collection_name, query, sort, bad))
+    return problems
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Create MongoDB indexes and verify query plans")
+    parser.add_argument("--check", action="store_true", help="explain() every route query and fail on COLLSCAN / in-memory SORT")
+    args = parser.parse_args()
+
+    db = await DatabaseConnection.connect()
+    try:
+        await ensure_indexes(db)
+        if args.check:
+            problems = await check_query_plans(db)
+            if problems:
+                print(f"❌ {len(problems)} query shape(s) need an index")
+                return 1
+            print("✅ All query shapes use indexes")
+        return 0
+    finally:
+        await DatabaseConnection.disconnect()
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
@@ -1,11 +1,17 @@
-from pymongo import MongoClient
+from motor.motor_asyncio import AsyncIOMotorClient
 from dotenv import load_dotenv
+from services.metrics import MongoCommandTimer
 import os
 import sys
 
 # Load environment variables
 load_dotenv()
 
+# Connection pool settings
+MONGO_MAX_POOL_SIZE = int(os.getenv('MONGO_MAX_POOL_SIZE', '100'))
+MONGO_MIN_POOL_SIZE = int(os.getenv('MONGO_MIN_POOL_SIZE', '10'))
+MONGO_WAIT_QUEUE_TIMEOUT_MS = int(os.getenv('MONGO_WAIT_QUEUE_TIMEOUT_MS', '5000'))
+
 class DatabaseConnection:
     _instance = None
     _client = None
@@ -16,32 +22,42 @@ class DatabaseConnection:
         try:
             # Retrieve MongoDB connection string from environment variable
             mongo_uri = os.getenv('MONGO_URI')
-            
+
             if not mongo_uri:
                 raise ValueError("MongoDB URI not found in environment variables")
-            
+
             # Create MongoDB client with updated parameters
             # In newer PyMongo versions, SSL options should be in the connection string
-            if '?' in mongo_uri:
+            # URIs that set tls/ssl themselves (e.g. a local mongod with tls=false) are left alone
+            if 'tls=' in mongo_uri or 'ssl=' in mongo_uri:
+                pass
+            elif '?' in mongo_uri:
                 mongo_uri += '&tlsInsecure=true'
             else:
                 mongo_uri += '?tlsInsecure=true'
-                
-            cls._client = MongoClient(
+
+            # Async client: operations yield to the event loop instead of blocking it,
+            # so concurrency is bounded by the pool rather than by the number of workers
+            cls._client = AsyncIOMotorClient(
                 mongo_uri,
                 connectTimeoutMS=30000,
-                socketTimeoutMS=30000
+                socketTimeoutMS=30000,
+                maxPoolSize=MONGO_MAX_POOL_SIZE,
+                minPoolSize=MONGO_MIN_POOL_SIZE,
+                waitQueueTimeoutMS=MONGO_WAIT_QUEUE_TIMEOUT_MS,
+                # Per-command latency for /metrics
+                event_listeners=[MongoCommandTimer()]
             )
-            
+
             # Verify connection
-            cls._client.admin.command('ping')
+            await cls._client.admin.command('ping')
             print("✅ Successfully connected to MongoDB")
-            
+
             # Set database
             cls._db = cls._client['college_project']
-            
+
             return cls._db
-        
+
         except Exception as e:
             print(f"❌ Critical Error connecting to MongoDB: {e}")
             print("Exiting application due to database connection failure")
@@ -53,7 +69,7 @@ class DatabaseConnection:
         Get the database instance
         """
         if cls._db is None:
-            cls._db = cls.connect()
+            raise RuntimeError("Database is not connected; DatabaseConnection.connect() must be awaited at startup")
         return cls._db
 
     @classmethod
@@ -64,6 +80,17 @@ class DatabaseConnection:
         db = cls.get_database()
         return db[collection_name]
 
+    @classmethod
+    async def ping(cls):
+        """Return whether the database answers a ping"""
+        if cls._client is None:
+            return False
+        try:
+            await cls._client.admin.command('ping')
+            return True
+        except Exception:
+            return False
+
     @classmethod
     async def disconnect(cls):
         """Disconnect from MongoDB"""
@@ -74,4 +101,4 @@ class DatabaseConnection:
             print("❌ MongoDB connection closed")
 
 # Ensure connection is established when the module is imported
-db_connection = DatabaseConnection()
\ No newline at end of file
+db_connection = DatabaseConnection()
@@ -0,0 +1,265 @@
+"""Pre-fork launcher: load the app once, then fork uvicorn workers that share it copy-on-write.
+
+usage: python prefork.py [--workers 4] [--host 0.0.0.0] [--port 8000]
+           [--max-requests 5000] [--max-worker-memory-mb 1500] [--status-file prefork_status.json]
+
+The parent imports the app (TensorFlow/Keras or the TFLite runtime, OpenCV,
+FastAPI) and preloads the emotion model assets, freezes the GC
+so those objects are never written to again, binds the listening socket and
+forks the workers. Every worker accepts on the shared socket and builds only
+the per-process state that cannot cross fork(): the inference runtime and its
+thread pools, the MongoDB client and the executors.
+
+Workers are recycled after --max-requests requests (plus jitter, so they do not
+all restart together) or once their private memory exceeds
+--max-worker-memory-mb. RSS, PSS, shared and private memory of every worker is
+logged every --report-interval seconds and written to --status-file; PSS is the
+number to divide node memory by when sizing the worker count.
+"""
+import argparse
+import gc
+import json
+import logging
+import os
+import random
+import signal
+import socket
+import sys
+import time
+
+import uvicorn
+from dotenv import load_dotenv
+
+# Before the PREFORK_* defaults below; the app itself only loads .env once main() imports it
+load_dotenv()
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger("prefork")
+
+WORKERS = int(os.getenv("PREFORK_WORKERS", "4"))
+MAX_REQUESTS = int(os.getenv("PREFORK_MAX_REQUESTS", "5000"))
+MAX_REQUESTS_JITTER = int(os.getenv("PREFORK_MAX_REQUESTS_JITTER", "500"))
+# 0 disables memory-based recycling
+MAX_WORKER_MEMORY_MB = float(os.getenv("PREFORK_MAX_WORKER_MEMORY_MB", "0"))
+CHECK_INTERVAL_SECONDS = 1.0
+
+
+def memory_usage(pid):
+    """Memory of a process in MB: rss, pss, shared and private (from smaps_rollup when the kernel has it)."""
+    fields = {}
+    try:
+        with open(f"/proc/{pid}/smaps_rollup") as f:
+            for line in f:
+                parts = line.split()
+                if len(parts) == 3 and parts[2] == "kB":
+                    fields[parts[0].rstrip(":")] = int(parts[1]) / 1024
+    except OSError:
+        try:
+            with open(f"/proc/{pid}/status") as f:
+                for line in f:
+                    if line.startswith("VmRSS:"):
+                        return {"rss_mb": int(line.split()[1]) / 1024}
+        except OSError:
+            pass
+        return {}
+    return {
+        "rss_mb": fields.get("Rss", 0.0),
+        "pss_mb": fields.get("Pss", 0.0),
+        "shared_mb": fields.get("Shared_Clean", 0.0) + fields.get("Shared_Dirty", 0.0),
+        "private_mb": fields.get("Private_Clean", 0.0) + fields.get("Private_Dirty", 0.0),
+    }
+
+
+class PreforkServer:
+    def __init__(self, app, sock, args):
+        self.app = app
+        self.sock = sock
+        self.args = args
+        self.workers = {}  # pid -> {"started_at", "retiring_since"}
+        self.running = True
+        self.last_report = 0.0
+
+    # Workers
+
+    def spawn(self):
+        pid = os.fork()
+        if pid == 0:
+            self.run_worker()
+        self.workers[pid] = {"started_at": time.time(), "retiring_since": None}
+        logger.info(f"Started worker {pid}")
+
+    def run_worker(self):
+        status = 0
+        try:
+            for sig in (signal.SIGTERM, signal.SIGINT, signal.SIGCHLD):
+                signal.signal(sig, signal.SIG_DFL)
+            random.seed()
+            max_requests = None
+            if self.args.max_requests:
+                max_requests = self.args.max_requests + random.randint(0, self.args.max_requests_jitter)
+            config = uvicorn.Config(
+                self.app,
+                log_level=self.args.log_level,
+                limit_max_requests=max_requests,
+                timeout_graceful_shutdown=self.args.graceful_timeout,
+            )
+            uvicorn.Server(config).run(sockets=[self.sock])
+        except BaseException:
+            logger.exception("Worker crashed")
+            status = 1
+        finally:
+            # Never fall back into the parent's loop
+            os._exit(status)
+
+    def retire(self, pid, reason):
+        """Ask a worker to finish its in-flight requests and exit; a replacement starts right away."""
+        worker = self.workers[pid]
+        if worker["retiring_since"] is not None:
+            return
+        logger.info(f"Recycling worker {pid}: {reason}")
+        worker["retiring_since"] = time.monotonic()
+        os.kill(pid, signal.SIGTERM)
+        if self.running:
+            self.spawn()
+
+    def reap(self):
+        while self.workers:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                return
+            if pid == 0:
+                return
+            worker = self.workers.pop(pid, None)
+            if worker is None:
+                continue
+            logger.info(f"Worker {pid} exited with status {os.waitstatus_to_exitcode(status)}")
+            if self.running and worker["retiring_since"] is None:
+                # Exited on its own: request limit reached, or crashed
+                if time.time() - worker["started_at"] < 1:
+                    time.sleep(1)  # don't spin on a worker that dies at startup
+                self.spawn()
+
+    def check_workers(self):
+        now = time.monotonic()
+        for pid, worker in list(self.workers.items()):
+            if worker["retiring_since"] is not None:
+                if now - worker["retiring_since"] > self.args.graceful_timeout + 5:
+                    logger.warning(f"Worker {pid} did not exit after SIGTERM, killing it")
+                    os.kill(pid, signal.SIGKILL)
+                continue
+            if self.args.max_worker_memory_mb:
+                usage = memory_usage(pid)
+                # Private memory grows with leaks; shared pages are the parent's and don't count against a worker
+                grown = usage.get("private_mb", usage.get("rss_mb", 0.0))
+                if grown > self.args.max_worker_memory_mb:
+                    self.retire(pid, f"{grown:.0f} MB private memory > {self.args.max_worker_memory_mb:.0f} MB")
+
+    # Reporting
+
+    def report(self):
+        workers = []
+        for pid, worker in sorted(self.workers.items()):
+            workers.append({
+                "pid": pid,
+                "started_at": worker["started_at"],
+                "retiring": worker["retiring_since"] is not None,
+                **memory_usage(pid),
+            })
+        totals = {
+            key: sum(worker.get(key, 0.0) for worker in workers)
+            for key in ("rss_mb", "pss_mb", "private_mb")
+        }
+        status = {
+            "parent": {"pid": os.getpid(), **memory_usage(os.getpid())},
+            "workers": workers,
+            "totals": totals,
+            "updated_at": time.time(),
+        }
+        logger.info(
+            "Workers: " + ", ".join(
+                f"{w['pid']} rss={w.get('rss_mb', 0):.0f}MB pss={w.get('pss_mb', 0):.0f}MB private={w.get('private_mb', 0):.0f}MB"
+                for w in workers
+            ) + f" | total pss={totals['pss_mb']:.0f}MB"
+        )
+        if self.args.status_file:
+            tmp_path = self.args.status_file + ".tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(status, f, indent=2)
+            os.replace(tmp_path, self.args.status_file)
+
+    # Main loop
+
+    def stop(self, signum, frame):
+        self.running = False
+
+    def run(self):
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+        for _ in range(self.args.workers):
+            self.spawn()
+
+        while self.running:
+            self.reap()
+            self.check_workers()
+            if time.monotonic() - self.last_report >= self.args.report_interval:
+                self.last_report = time.monotonic()
+                self.report()
+            time.sleep(CHECK_INTERVAL_SECONDS)
+
+        logger.info("Shutting down workers")
+        for pid in list(self.workers):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+        deadline = time.monotonic() + self.args.graceful_timeout + 5
+        while self.workers and time.monotonic() < deadline:
+            self.reap()
+            time.sleep(0.1)
+        for pid in self.workers:
+            os.kill(pid, signal.SIGKILL)
+
+
+def bind_socket(host, port, backlog=2048):
+    sock = socket.socket(socket.AF_INET6 if ":" in host else socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(backlog)
+    sock.set_inheritable(True)
+    return sock
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve the API from pre-forked workers sharing the loaded model assets")
+    parser.add_argument("--workers", type=int, default=WORKERS)
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--max-requests", type=int, default=MAX_REQUESTS, help="recycle a worker after this many requests (0 = never)")
+    parser.add_argument("--max-requests-jitter", type=int, default=MAX_REQUESTS_JITTER)
+    parser.add_argument("--max-worker-memory-mb", type=float, default=MAX_WORKER_MEMORY_MB,
+                        help="recycle a worker once its private memory exceeds this (0 = never)")
+    parser.add_argument("--graceful-timeout", type=int, default=30)
+    parser.add_argument("--report-interval", type=float, default=60)
+    parser.add_argument("--status-file", default=os.getenv("PREFORK_STATUS_FILE"), help="per-worker memory as JSON")
+    parser.add_argument("--log-level", default="info")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    from api import app
+    from routes import emotions
+    emotions.preload_model_assets()
+    logger.info(f"App and model assets loaded in the parent in {time.perf_counter() - start:.1f}s")
+
+    # Objects allocated so far are never collected; keeps the GC from touching (and so copying) shared pages
+    gc.collect()
+    gc.freeze()
+
+    sock = bind_socket(args.host, args.port)
+    logger.info(f"Listening on {args.host}:{args.port} with {args.workers} workers")
+    PreforkServer(app, sock, args).run()
+    sock.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
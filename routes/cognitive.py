@@ -1,11 +1,22 @@
-from fastapi import APIRouter, HTTPException, Request
+from fastapi import APIRouter, HTTPException, Request, Response, status
 from bson import ObjectId
 from fastapi.encoders import jsonable_encoder
 from datetime import datetime
 from db.mongo import DatabaseConnection
 from schemas.testSchema import TestDataSchema, PersonalityTestSubmission
 from routes.users import get_current_user
+from security import is_bulk_uploader
 import traceback
+import hashlib
+import json
+import os
+from services.ttl_cache import TTLCache
+from services.json_response import FastJSONResponse
+from services.cognitive_scoring import get_rules, CURRENT_RULE_VERSION
+from services.request_timing import stage
+from schemas.testSchema import BulkSubmissionItem
+from pymongo.errors import BulkWriteError
+import asyncio
 
 router = APIRouter()
 
@@ -26,26 +37,72 @@ from routes.cognitive import get_current_user  # Import the existing authenticat
 
 router = APIRouter()
 
+# Question sets rarely change: cache them per test type together with a strong ETag.
+# The TTL bounds how long an edit made directly in the database can go unnoticed.
+question_cache = TTLCache(
+    max_size=64,
+    ttl=float(os.getenv('QUESTION_CACHE_TTL_SECONDS', '300'))
+)
+
+# Bulk ingestion limits
+BULK_MAX_SUBMISSIONS = int(os.getenv('BULK_MAX_SUBMISSIONS', '50000'))
+# Longest NDJSON line accepted; one submission is a few KB
+BULK_MAX_LINE_BYTES = int(os.getenv('BULK_MAX_LINE_BYTES', str(1024 * 1024)))
+BULK_INSERT_CHUNK = 1000
+
+def invalidate_questions(test_type=None):
+    """Drop cached question sets; call after updating the test_data collection."""
+    if test_type is None:
+        question_cache.clear()
+    else:
+        question_cache.invalidate(test_type)
+
+def question_etag(test_data):
+    """Strong ETag derived from the question set's content."""
+    canonical = json.dumps(test_data, sort_keys=True, default=str)
+    return '"' + hashlib.sha256(canonical.encode('utf-8')).hexdigest()[:32] + '"'
+
+def etag_matches(if_none_match, etag):
+    if not if_none_match:
+        return False
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in candidates or etag in candidates
+
 @router.get("/cognitive/questions", response_model=TestDataSchema)
 async def get_test_questions(
+    request: Request,
+    response: Response,
     test_type: str = "Cognitive Assessment", 
     current_user: dict = Depends(get_current_user)  # Add authentication dependency
 ):
-    # Get test_data collection
-    test_data_collection = DatabaseConnection.get_collection('test_data')
-    
-    # Find the document by test type
-    test_data = test_data_collection.find_one({"test_type": test_type})
-    
-    if not test_data:
-        raise HTTPException(
-            status_code=404, 
-            detail=f"No test data found for test type: {test_type}"
-        )
-    
-    # Remove MongoDB's internal _id 
-    test_data.pop('_id', None)
-    
+    cached = question_cache.get(test_type)
+    if cached is None:
+        # Get test_data collection
+        test_data_collection = DatabaseConnection.get_collection('test_data')
+        
+        # Find the document by test type
+        test_data = await test_data_collection.find_one({"test_type": test_type})
+        
+        if not test_data:
+            raise HTTPException(
+                status_code=404, 
+                detail=f"No test data found for test type: {test_type}"
+            )
+        
+        # Remove MongoDB's internal _id 
+        test_data.pop('_id', None)
+        
+        cached = (test_data, question_etag(test_data))
+        question_cache.set(test_type, cached)
+
+    test_data, etag = cached
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+
+    # The client already has this version of the questions
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+
+    response.headers.update(headers)
     return test_data
 
 @router.post("/cognitive/submit")
@@ -55,7 +112,8 @@ async def submit_cognitive_test(
 ):
     try:
         # Parse request body
-        test_data = await request.json()
+        with stage("parse"):
+            test_data = await request.json()
         
         # Validate input
         if not test_data or 'questions_data' not in test_data:
@@ -68,7 +126,8 @@ async def submit_cognitive_test(
         submission = PersonalityTestSubmission(**test_data)
         
         # Generate the result
-        generated_result = generate_result(submission.questions_data)
+        with stage("scoring"):
+            generated_result = generate_result(submission.questions_data)
 
         # Get collections
         cognitive_results_collection = DatabaseConnection.get_collection('cognitive_test_results')
@@ -80,11 +139,13 @@ async def submit_cognitive_test(
             "test_type": "Cognitive Assessment",
             "submitted_at": datetime.utcnow(),
             "questions_data": test_data['questions_data'],  # Raw question data
-            "generated_result": generated_result  # Store the result
+            "generated_result": generated_result,  # Store the result
+            "scoring_version": CURRENT_RULE_VERSION
         }
         
         # Insert submission into the database
-        result = cognitive_results_collection.insert_one(submission_doc)
+        with stage("mongo_insert"):
+            result = await cognitive_results_collection.insert_one(submission_doc)
         
         return {
             "message": "Cognitive test submitted successfully",
@@ -101,6 +162,175 @@ async def submit_cognitive_test(
             detail=f"Internal server error: {str(e)}"
         )
     
+# Dependency for the bulk endpoint: it writes results for other students
+async def require_bulk_uploader(current_user: dict = Depends(get_current_user)):
+    if not is_bulk_uploader(current_user["_id"]):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Bulk submission is limited to partner and admin accounts"
+        )
+    return current_user
+
+def too_many_submissions():
+    return HTTPException(
+        status_code=413,
+        detail=f"At most {BULK_MAX_SUBMISSIONS} submissions per request"
+    )
+
+async def parse_bulk_body(request):
+    """Submissions from a JSON array body or, for application/x-ndjson, one JSON object per line.
+
+    NDJSON is read incrementally and abandoned with 413 as soon as it holds
+    more than BULK_MAX_SUBMISSIONS lines or a line longer than BULK_MAX_LINE_BYTES,
+    so oversized uploads are never buffered whole.
+    """
+    if request.headers.get("content-type", "").startswith("application/x-ndjson"):
+        items = []
+        buffer = b""
+        async for chunk in request.stream():
+            buffer += chunk
+            *lines, buffer = buffer.split(b"\n")
+            items.extend(line for line in lines if line.strip())
+            if len(items) > BULK_MAX_SUBMISSIONS:
+                raise too_many_submissions()
+            if len(buffer) > BULK_MAX_LINE_BYTES:
+                raise HTTPException(
+                    status_code=413,
+                    detail=f"Submission lines are limited to {BULK_MAX_LINE_BYTES} bytes"
+                )
+        if buffer.strip():
+            items.append(buffer)
+        # Lines are decoded lazily so a bad line only fails its own item
+        if len(items) > BULK_MAX_SUBMISSIONS:
+            raise too_many_submissions()
+        return items
+    try:
+        body = await request.json()
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Malformed JSON body")
+    if not isinstance(body, list):
+        raise HTTPException(status_code=400, detail="Expected a JSON array of submissions")
+    if len(body) > BULK_MAX_SUBMISSIONS:
+        raise too_many_submissions()
+    return body
+
+def validate_bulk_item(raw):
+    if isinstance(raw, (bytes, str)):
+        raw = json.loads(raw)
+    item = BulkSubmissionItem(**raw)
+    if not item.email and not item.user_id:
+        raise ValueError("Each submission needs an email or user_id")
+    if item.user_id and not ObjectId.is_valid(item.user_id):
+        raise ValueError("Invalid user_id")
+    if not item.questions_data:
+        raise ValueError("questions_data is empty")
+    return item
+
+async def resolve_students(items):
+    """Map every email / user_id referenced by the batch to its user document in two queries."""
+    users_collection = DatabaseConnection.get_collection('users')
+    emails = list({item.email for item in items if item.email})
+    user_ids = list({ObjectId(item.user_id) for item in items if item.user_id})
+    by_email, by_id = {}, {}
+    projection = {"_id": 1, "username": 1, "email": 1}
+    if emails:
+        async for user in users_collection.find({"email": {"$in": emails}}, projection):
+            by_email[user["email"]] = user
+    if user_ids:
+        async for user in users_collection.find({"_id": {"$in": user_ids}}, projection):
+            by_id[str(user["_id"])] = user
+    return by_email, by_id
+
+async def ingest_submissions(raw_items, uploader):
+    """Validate, score and insert a batch of submissions; returns the per-item report."""
+    errors = []
+    valid = []  # (index, item)
+    for index, raw in enumerate(raw_items):
+        try:
+            valid.append((index, validate_bulk_item(raw)))
+        except Exception as e:
+            errors.append({"index": index, "error": str(e)})
+
+    by_email, by_id = await resolve_students([item for _, item in valid])
+    resolved = []  # (index, item, user)
+    for index, item in valid:
+        user = by_id.get(item.user_id) if item.user_id else by_email.get(item.email)
+        if user is None:
+            errors.append({"index": index, "error": "User not found"})
+        else:
+            resolved.append((index, item, user))
+
+    # Score everything in one vectorized pass, off the event loop
+    rules = get_rules()
+    loop = asyncio.get_running_loop()
+    results = await loop.run_in_executor(None, rules.score_batch, [
+        ([q.question_id for q in item.questions_data], [q.selected_answer for q in item.questions_data])
+        for _, item, _ in resolved
+    ])
+
+    now = datetime.utcnow()
+    docs = [
+        {
+            "user_id": user["_id"],
+            "username": user["username"],
+            "test_type": "Cognitive Assessment",
+            "submitted_at": item.submitted_at or now,
+            "questions_data": [q.model_dump() for q in item.questions_data],
+            "generated_result": result,
+            "scoring_version": rules.version,
+            "submitted_by": uploader["username"],
+        }
+        for (_, item, user), result in zip(resolved, results)
+    ]
+
+    # Unordered bulk inserts in chunks: one failing document doesn't stop the rest
+    cognitive_results_collection = DatabaseConnection.get_collection('cognitive_test_results')
+    inserted = 0
+    for start in range(0, len(docs), BULK_INSERT_CHUNK):
+        chunk = docs[start:start + BULK_INSERT_CHUNK]
+        try:
+            result = await cognitive_results_collection.insert_many(chunk, ordered=False)
+            inserted += len(result.inserted_ids)
+        except BulkWriteError as e:
+            write_errors = e.details.get("writeErrors", [])
+            inserted += e.details.get("nInserted", len(chunk) - len(write_errors))
+            for write_error in write_errors:
+                index = resolved[start + write_error["index"]][0]
+                errors.append({"index": index, "error": write_error.get("errmsg", "Write failed")})
+
+    errors.sort(key=lambda error: error["index"])
+    return {
+        "received": len(raw_items),
+        "inserted": inserted,
+        "failed": len(errors),
+        "errors": errors,
+    }
+
+@router.post("/cognitive/submit/bulk")
+async def submit_cognitive_tests_bulk(
+    request: Request,
+    current_user: dict = Depends(require_bulk_uploader)
+):
+    """Ingest many offline-collected submissions in one request.
+
+    Accepts a JSON array, or NDJSON with Content-Type application/x-ndjson. Each
+    submission carries `questions_data` plus the student's `email` or `user_id`
+    (and optionally `submitted_at`). Invalid items are reported by index and skipped.
+    """
+    try:
+        raw_items = await parse_bulk_body(request)
+        report = await ingest_submissions(raw_items, current_user)
+        report["message"] = "Bulk submission processed"
+        return report
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"Error in submit_cognitive_tests_bulk: {traceback.format_exc()}")
+        raise HTTPException(
+            status_code=500,
+            detail=f"Internal server error: {str(e)}"
+        )
+
 @router.get("/cognitive/status")
 async def get_cognitive_test_status(email: str):
     try:
@@ -111,7 +341,7 @@ async def get_cognitive_test_status(email: str):
         user_collection = DatabaseConnection.get_collection('users')
 
         # Search for the user by email
-        user = user_collection.find_one({"email": email})
+        user = await user_collection.find_one({"email": email})
         if not user:
             raise HTTPException(
                 status_code=404,
@@ -124,7 +354,7 @@ async def get_cognitive_test_status(email: str):
         cognitive_results_collection = DatabaseConnection.get_collection('cognitive_test_results')
 
         # Check if the user has completed the cognitive test
-        test_result = cognitive_results_collection.find_one({
+        test_result = await cognitive_results_collection.find_one({
             "user_id": ObjectId(user_id),
             "test_type": "Cognitive Assessment"
         })
@@ -136,16 +366,12 @@ async def get_cognitive_test_status(email: str):
                 "test_data": None
             }
 
-        # Convert ObjectId and other non-serializable fields
-        test_result["_id"] = str(test_result["_id"])
-        test_result["user_id"] = str(test_result["user_id"])
-        completed_at = test_result.get('submitted_at').isoformat() if 'submitted_at' in test_result else None
-
-        return {
+        # ObjectId and datetime fields are serialized by FastJSONResponse
+        return FastJSONResponse({
             "has_completed_test": True,
-            "completed_at": completed_at,
+            "completed_at": test_result.get('submitted_at'),
             "test_data": test_result
-        }
+        })
     except Exception as e:
         print(f"Error fetching test status: {traceback.format_exc()}")
         raise HTTPException(
@@ -153,91 +379,14 @@ async def get_cognitive_test_status(email: str):
             detail=f"Error fetching test status: {str(e)}"
         )
 
-def generate_result(questions_data):
+def generate_result(questions_data, rule_version=CURRENT_RULE_VERSION):
     try:
-        # Assuming each question is worth 5 points
-        total_score = 0
-        total_questions = len(questions_data)
-        
-        # Define scoring logic based on answer options (you can modify the scale as per your requirements)
-        option_to_score = {
-            "Never": 1,
-            "Rarely": 2,
-            "Sometimes": 3,
-            "Often": 4,
-            "Always": 5
-        }
-
-        # Areas of improvement (this can be expanded based on your questions)
-        areas_of_improvement = {
-            "Motivation": [],
-            "Enthusiasm": [],
-            "Stress Management": [],
-            "Social Connection": [],
-            "Emotional Balance": []
-        }
-
-        # Test summary data
-        summary = []
-        
-        # Process each question's data
-        for question in questions_data:
-            # Access the Pydantic model's attributes directly
-            question_id = question.question_id
-            selected_answer = question.selected_answer
-            
-            # Get the score for the selected answer
-            score = option_to_score.get(selected_answer, 0)  # Default to 0 if not found
-            total_score += score
-            
-            # Here we can map question IDs to specific areas (you can expand this logic)
-            if question_id in [1, 2, 5, 6]:
-                areas_of_improvement["Motivation"].append(question_id)
-            elif question_id in [3, 4, 9, 10]:
-                areas_of_improvement["Enthusiasm"].append(question_id)
-            elif question_id in [7, 8, 16]:
-                areas_of_improvement["Stress Management"].append(question_id)
-            elif question_id in [12, 13, 17]:
-                areas_of_improvement["Social Connection"].append(question_id)
-            elif question_id in [14, 15, 18]:
-                areas_of_improvement["Emotional Balance"].append(question_id)
-            
-            # Collecting detailed information for summary
-            summary.append(f"Q{question_id}: Selected answer - {selected_answer} (Score: {score})")
-        
-        # Calculate percentage score
-        percentage_score = (total_score / (total_questions * 5)) * 100
-        
-        # Generate test summary
-        test_summary = "Your overall performance on this cognitive assessment shows strong potential, with notable areas for improvement. "
-        if len(areas_of_improvement["Motivation"]) > 0:
-            test_summary += "Focus on enhancing your motivation, "
-        if len(areas_of_improvement["Enthusiasm"]) > 0:
-            test_summary += "boosting your enthusiasm, "
-        if len(areas_of_improvement["Stress Management"]) > 0:
-            test_summary += "improving your stress management skills, "
-        if len(areas_of_improvement["Social Connection"]) > 0:
-            test_summary += "strengthening your social connections, "
-        if len(areas_of_improvement["Emotional Balance"]) > 0:
-            test_summary += "and balancing your emotions more effectively. "
-        
-        # Trim the trailing comma and space from the summary if needed
-        test_summary = test_summary.rstrip(", ")
-        
-        # Finalize the summary to ensure it reads well
-        test_summary += "Keep working on these areas to further enhance your cognitive well-being."
-
-        # Create the result object to return
-        result = {
-            "total_score": total_score,
-            "percentage_score": percentage_score,
-            "test_summary": test_summary,
-            "areas_of_improvement": [area for area, questions in areas_of_improvement.items() if len(questions) > 0],
-            "detailed_scores": [{"question_id": question_id, "selected_option": selected_answer, "score": option_to_score.get(selected_answer, 0)} for question in questions_data]
-        }
-        
-        return result
-    
+        # Scoring is driven by the versioned rule table in services/cognitive_scoring.py
+        rules = get_rules(rule_version)
+        return rules.score(
+            [question.question_id for question in questions_data],
+            [question.selected_answer for question in questions_data]
+        )
     except Exception as e:
         raise ValueError(f"Failed to generate results: {str(e)}")
 
@@ -251,11 +400,11 @@ async def get_cognitive_test_data(email: str):
         user_collection = DatabaseConnection.get_collection('users')
         cognitive_results_collection = DatabaseConnection.get_collection('cognitive_test_results')
 
-        user = user_collection.find_one({"email": email})
+        user = await user_collection.find_one({"email": email})
         if not user:
             raise HTTPException(status_code=404, detail="User not found")
 
-        test_result = cognitive_results_collection.find_one(
+        test_result = await cognitive_results_collection.find_one(
             {"user_id": ObjectId(user["_id"])},
             sort=[("submitted_at", -1)]
         )
@@ -263,7 +412,7 @@ async def get_cognitive_test_data(email: str):
         if not test_result:
             raise HTTPException(status_code=404, detail="No test data found")
 
-        return {
+        return FastJSONResponse({
             "total_score": test_result["generated_result"]["total_score"],
             "percentage_score": test_result["generated_result"]["percentage_score"],
             "test_summary": test_result["generated_result"]["test_summary"],
@@ -271,6 +420,6 @@ async def get_cognitive_test_data(email: str):
             "detailed_scores": test_result["generated_result"]["detailed_scores"],
             "questions_data": test_result["questions_data"],
             "submitted_at": test_result["submitted_at"]
-        }
+        })
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
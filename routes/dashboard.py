@@ -0,0 +1,88 @@
+from fastapi import APIRouter, HTTPException
+from bson import ObjectId
+from db.mongo import DatabaseConnection
+from services.json_response import FastJSONResponse
+import asyncio
+import traceback
+
+router = APIRouter()
+
+# Only the fields the dashboard renders
+COGNITIVE_PROJECTION = {
+    "_id": 0,
+    "generated_result": 1,
+    "questions_data": 1,
+    "submitted_at": 1,
+}
+EMOTION_PROJECTION = {
+    "_id": 0,
+    "scores": 1,
+    "type": 1,
+    "filenames": 1,
+    "timestamp": 1,
+}
+
+async def fetch_dashboard(user_id):
+    """Latest cognitive result, completion status and latest emotion analysis, queried concurrently."""
+    cognitive_results_collection = DatabaseConnection.get_collection('cognitive_test_results')
+    emotion_collection = DatabaseConnection.get_collection('emotion_analyses')
+
+    latest_cognitive, completed_test, latest_emotion = await asyncio.gather(
+        cognitive_results_collection.find_one(
+            {"user_id": ObjectId(user_id)},
+            COGNITIVE_PROJECTION,
+            sort=[("submitted_at", -1)]
+        ),
+        cognitive_results_collection.find_one(
+            {"user_id": ObjectId(user_id), "test_type": "Cognitive Assessment"},
+            {"_id": 0, "submitted_at": 1}
+        ),
+        emotion_collection.find_one(
+            {"user_id": str(user_id)},
+            EMOTION_PROJECTION,
+            sort=[("timestamp", -1)]
+        ),
+    )
+
+    cognitive_result = None
+    if latest_cognitive:
+        generated_result = latest_cognitive["generated_result"]
+        cognitive_result = {
+            "total_score": generated_result["total_score"],
+            "percentage_score": generated_result["percentage_score"],
+            "test_summary": generated_result["test_summary"],
+            "areas_of_improvement": generated_result["areas_of_improvement"],
+            "detailed_scores": generated_result["detailed_scores"],
+            "questions_data": latest_cognitive["questions_data"],
+            "submitted_at": latest_cognitive["submitted_at"],
+        }
+
+    return {
+        "has_completed_test": completed_test is not None,
+        "completed_at": completed_test.get("submitted_at") if completed_test else None,
+        "cognitive_result": cognitive_result,
+        "emotion_result": latest_emotion,
+    }
+
+@router.get("/dashboard")
+async def get_dashboard(email: str):
+    """Everything the dashboard shows for a user in a single call.
+
+    Replaces calling /cognitive/status, /cognitive/test-data and /emotion/test-data
+    one after another (three user lookups plus three result queries).
+    """
+    try:
+        if not email:
+            raise HTTPException(status_code=400, detail="Email parameter is required.")
+
+        user_collection = DatabaseConnection.get_collection('users')
+        user = await user_collection.find_one({"email": email}, {"_id": 1})
+        if not user:
+            raise HTTPException(status_code=404, detail="User not found")
+
+        return FastJSONResponse(await fetch_dashboard(user["_id"]))
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"Error fetching dashboard: {traceback.format_exc()}")
+        raise HTTPException(status_code=500, detail=f"Error fetching dashboard: {str(e)}")
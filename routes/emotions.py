@@ -1,14 +1,30 @@
-from fastapi import APIRouter, HTTPException, Depends, UploadFile, File
+from fastapi import APIRouter, HTTPException, Depends, UploadFile, File, Query
+from fastapi.responses import StreamingResponse
 from db.mongo import DatabaseConnection
 from routes.users import get_current_user
+from services.inference_executor import inference_executor, InferenceQueueFull
+from services.batch_scheduler import MicroBatchScheduler
+from services.frame_sampler import sample_frames
+from services.face_tracker import FaceTracker
+from services.result_cache import ResultCache
+from services.job_queue import JobQueue
+from services.json_response import FastJSONResponse, dumps
+from services.emotion_rollups import ROLLUP_COLLECTION, record_analysis, rollup_to_trend
+from services.metrics import emotion_stage_latency
+from services.request_timing import stage
+from bson import ObjectId
 import cv2
 import numpy as np
 from datetime import datetime
 import tempfile
+import hashlib
+import asyncio
+import time
 import os
-from typing import List
-from tensorflow.keras.models import model_from_json
+from typing import List, Optional
+import base64
 import logging
+import threading
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
@@ -18,43 +34,238 @@ router = APIRouter()
 
 # Global variables for the model and cascade
 emotion_model = None
+# Checks that the cascade loads; detection itself uses thread_cascade()
 face_cascade = None
+batch_scheduler = None
+model_version = None
+# Serialized model (and Keras weight arrays) read by preload_model_assets() in a pre-fork parent
+model_assets = None
+model_weights = None
+
+# Per-file results keyed by upload content hash + model version
+result_cache = ResultCache(get_collection=DatabaseConnection.get_collection)
+
+# "keras" serves the original model, "tflite" serves the artifact built by services/ExportEmotionModel.py
+MODEL_BACKEND = os.getenv("EMOTION_MODEL_BACKEND", "keras").lower()
+TFLITE_MODEL_PATH = os.getenv("EMOTION_TFLITE_PATH", "services/emotion_model.tflite")
+
+VIDEO_EXTENSIONS = ('.mp4', '.avi', '.mov')
+# Uploads larger than this are rejected with 413
+MAX_UPLOAD_BYTES = int(os.getenv("EMOTION_MAX_UPLOAD_MB", "100")) * 1024 * 1024
+# Videos are spooled here for cv2.VideoCapture; defaults to the memory-backed /dev/shm when available
+VIDEO_SPOOL_DIR = os.getenv("VIDEO_SPOOL_DIR") or ("/dev/shm" if os.path.isdir("/dev/shm") else None)
+SPOOL_CHUNK_BYTES = 1024 * 1024
+# Frames sampled per video, spread over its length or one every EMOTION_FRAME_INTERVAL_SEC seconds
+NUM_FRAMES = int(os.getenv("EMOTION_NUM_FRAMES", "10"))
+FRAME_INTERVAL_SECONDS = float(os.getenv("EMOTION_FRAME_INTERVAL_SEC")) if os.getenv("EMOTION_FRAME_INTERVAL_SEC") else None
+# Background jobs: where their uploads are kept until processed, and status polling settings
+JOB_UPLOAD_DIR = os.getenv("EMOTION_JOB_DIR", os.path.join(tempfile.gettempdir(), "emotion_jobs"))
+JOB_PROGRESS_INTERVAL = 0.5
+JOB_POLL_INTERVAL = 0.5
+JOB_MAX_WAIT_SECONDS = 30
+# /emotion/status pagination
+STATUS_PAGE_SIZE = 50
+STATUS_MAX_PAGE_SIZE = 500
+STATUS_FIELDS = {"_id", "user_id", "username", "timestamp", "scores", "type", "filenames"}
+# Video faces: full-frame detection every N sampled frames on a frame shrunk to this width
+TRACK_KEYFRAME_INTERVAL = int(os.getenv("EMOTION_TRACK_KEYFRAME_INTERVAL", "5"))
+DETECT_MAX_WIDTH = int(os.getenv("EMOTION_DETECT_MAX_WIDTH", "640"))
+
+# Load the model in the background at startup (otherwise on first use) and warm it up after loading
+LOAD_ON_STARTUP = os.getenv("EMOTION_LOAD_ON_STARTUP", "true").lower() in ("1", "true", "yes")
+WARMUP = os.getenv("EMOTION_WARMUP", "true").lower() in ("1", "true", "yes")
+_model_lock = asyncio.Lock()
+# Startup and first-request timings, reported by /ready
+lifecycle_stats = {
+    "module_imported_at": time.time(),
+    "model_load_seconds": None,
+    "warmup_seconds": None,
+    "ready_after_seconds": None,
+    "first_request_seconds": None,
+}
 
 # Emotion labels
 emotion_dict = {0: "Angry", 1: "Disgusted", 2: "Fearful", 3: "Happy", 4: "Neutral", 5: "Sad", 6: "Surprised"}
 
+def compute_model_version(weights_path):
+    """Fingerprint the served weights together with every setting that changes per-file results."""
+    digest = hashlib.sha256()
+    with open(weights_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(SPOOL_CHUNK_BYTES), b""):
+            digest.update(chunk)
+    settings = f"{MODEL_BACKEND}|{NUM_FRAMES}|{FRAME_INTERVAL_SECONDS}|{TRACK_KEYFRAME_INTERVAL}|{DETECT_MAX_WIDTH}"
+    digest.update(settings.encode("utf-8"))
+    return digest.hexdigest()[:16]
+
+KERAS_WEIGHTS_PATH = "services/emotion_model.weights.h5"
+
+def read_keras_weights(path=KERAS_WEIGHTS_PATH):
+    """Read the Keras weights file into NumPy arrays, as {layer name: [arrays in variable order]}.
+
+    Understands the Keras 3 layout (.../<layer>/vars/<index>) and the legacy
+    h5 layout (layer_names / weight_names attributes). Needs no TensorFlow runtime,
+    so a pre-fork parent can do it once for all workers.
+    """
+    import h5py
+    weights = {}
+    with h5py.File(path, "r") as f:
+        if "layer_names" in f.attrs or "model_weights" in f:
+            group = f["model_weights"] if "model_weights" in f else f
+            for name in group.attrs["layer_names"]:
+                name = name.decode("utf-8") if isinstance(name, bytes) else name
+                weight_names = group[name].attrs.get("weight_names", [])
+                weights[name] = [
+                    group[name][w.decode("utf-8") if isinstance(w, bytes) else w][()] for w in weight_names
+                ]
+        else:
+            def collect(name, node):
+                parts = name.split("/")
+                if isinstance(node, h5py.Group) and len(parts) >= 2 and parts[-1] == "vars" and len(node):
+                    weights[parts[-2]] = [node[key][()] for key in sorted(node, key=int)]
+            f.visititems(collect)
+    return weights
+
+def apply_keras_weights(model, weights):
+    """set_weights on every layer from read_keras_weights output; False (and nothing set) if they don't match."""
+    assignments = []
+    for layer in model.layers:
+        expected = layer.get_weights()
+        if not expected:
+            continue
+        arrays = weights.get(layer.name)
+        if arrays is None or [a.shape for a in arrays] != [e.shape for e in expected]:
+            return False
+        assignments.append((layer, arrays))
+    for layer, arrays in assignments:
+        layer.set_weights(arrays)
+    return True
+
+def read_model_assets():
+    """Serialized model for the configured backend: the TFLite flatbuffer or the Keras architecture JSON."""
+    if MODEL_BACKEND == "tflite":
+        with open(TFLITE_MODEL_PATH, 'rb') as f:
+            return f.read()
+    with open('services/emotion_model.json', 'r') as json_file:
+        return json_file.read()
+
+def load_cascade():
+    cascade = cv2.CascadeClassifier('services/haarcascade_frontalface_default.xml')
+    if cascade.empty():
+        raise ValueError("Haar Cascade classifier is empty or invalid")
+    return cascade
+
+# detectMultiScale keeps per-call state inside the classifier, so each inference thread gets its own
+_thread_cascades = threading.local()
+
+def thread_cascade():
+    """The calling thread's Haar cascade, loaded on its first use."""
+    cascade = getattr(_thread_cascades, "cascade", None)
+    if cascade is None:
+        cascade = _thread_cascades.cascade = load_cascade()
+    return cascade
+
+# Inference threads load their cascade as they start rather than on their first request
+inference_executor.thread_initializer = thread_cascade
+
+def preload_model_assets():
+    """Load the fork-safe part of the pipeline, for a pre-fork parent process to share with its workers.
+
+    That is the inference libraries and the serialized model (for Keras also its
+    weight arrays, parsed with h5py). The Keras model / TFLite interpreter start
+    thread pools on first use that do not survive fork(), so load_model builds
+    them in each worker from these assets. The Haar cascade is loaded here only
+    to fail early when it is invalid: detection is not thread-safe, so every
+    inference thread of every worker loads its own (thread_cascade()).
+    """
+    global model_assets, model_weights, face_cascade
+    if MODEL_BACKEND == "tflite":
+        from services.tflite_backend import _load_interpreter_class
+        _load_interpreter_class()
+    else:
+        import tensorflow.keras.models  # noqa: F401
+        model_weights = read_keras_weights()
+    model_assets = read_model_assets()
+    face_cascade = load_cascade()
+    logger.info(f"Emotion model assets preloaded ({MODEL_BACKEND} backend)")
+
 def load_model():
     """Load the pre-trained emotion model and Haar Cascade classifier."""
-    global emotion_model, face_cascade
+    global emotion_model, face_cascade, batch_scheduler, model_version
     try:
-        # Load model architecture from JSON file
-        with open('services/emotion_model.json', 'r') as json_file:
-            model_json = json_file.read()
-        emotion_model = model_from_json(model_json)
-        # Load model weights
-        emotion_model.load_weights("services/emotion_model.weights.h5")
-        logger.info("Emotion model loaded successfully")
+        # Preloaded by a pre-fork parent, or read now
+        assets = model_assets if model_assets is not None else read_model_assets()
+        if MODEL_BACKEND == "tflite":
+            from services.tflite_backend import TFLiteEmotionModel
+            emotion_model = TFLiteEmotionModel(TFLITE_MODEL_PATH, model_content=assets)
+            model_version = compute_model_version(TFLITE_MODEL_PATH)
+        else:
+            from tensorflow.keras.models import model_from_json
+            # Build the model architecture from its JSON description
+            emotion_model = model_from_json(assets)
+            # Weights parsed by a pre-fork parent, otherwise read from disk
+            if model_weights is None or not apply_keras_weights(emotion_model, model_weights):
+                emotion_model.load_weights(KERAS_WEIGHTS_PATH)
+            model_version = compute_model_version(KERAS_WEIGHTS_PATH)
+        # The scheduler owns the model and batches crops across concurrent requests;
+        # a retry reuses the existing one rather than leaking its thread
+        if batch_scheduler is None:
+            batch_scheduler = MicroBatchScheduler(emotion_model.predict_on_batch)
+        else:
+            batch_scheduler.predict_fn = emotion_model.predict_on_batch
+        logger.info(f"Emotion model loaded successfully ({MODEL_BACKEND} backend)")
     except FileNotFoundError as e:
         logger.error(f"File not found: {str(e)}")
     except Exception as e:
         logger.error(f"Error loading emotion model: {str(e)}")
 
+    if face_cascade is not None and not face_cascade.empty():
+        return
     try:
         # Load Haar Cascade for face detection
-        face_cascade = cv2.CascadeClassifier('services/haarcascade_frontalface_default.xml')
-        if face_cascade.empty():
-            raise ValueError("Haar Cascade classifier is empty or invalid")
+        face_cascade = load_cascade()
         logger.info("Haar Cascade classifier loaded successfully")
     except FileNotFoundError as e:
         logger.error(f"File not found: {str(e)}")
     except Exception as e:
         logger.error(f"Error loading Haar Cascade: {str(e)}")
 
-# Load the model when the module is imported
-load_model()
+def model_ready():
+    return emotion_model is not None and face_cascade is not None and not face_cascade.empty()
+
+def warm_up():
+    """Push dummy inputs through detection and inference so the first real request skips graph tracing."""
+    # Detection runs on the inference threads, each with its own cascade: warm every one of them
+    inference_executor.prime(lambda: thread_cascade().detectMultiScale(np.zeros((96, 96), dtype=np.uint8), 1.1, 4))
+    for batch_size in sorted({1, batch_scheduler.max_batch_size}):
+        batch_scheduler.predict(np.zeros((batch_size, 48, 48, 1), dtype=np.float32))
+
+def _load_and_warm_up():
+    start = time.perf_counter()
+    load_model()
+    lifecycle_stats["model_load_seconds"] = time.perf_counter() - start
+    if WARMUP and model_ready():
+        start = time.perf_counter()
+        try:
+            warm_up()
+            lifecycle_stats["warmup_seconds"] = time.perf_counter() - start
+        except Exception as e:
+            logger.error(f"Error warming up emotion model: {str(e)}")
+    if model_ready():
+        lifecycle_stats["ready_after_seconds"] = time.time() - lifecycle_stats["module_imported_at"]
+        logger.info(f"Emotion pipeline ready: {lifecycle_stats}")
+
+async def ensure_model_loaded():
+    """Load (and warm up) the model once, off the event loop; returns whether it is usable."""
+    if model_ready():
+        return True
+    async with _model_lock:
+        if not model_ready():
+            loop = asyncio.get_running_loop()
+            await loop.run_in_executor(None, _load_and_warm_up)
+    return model_ready()
 
 def preprocess_face(face_img):
-    """Preprocess the face image for the emotion model."""
+    """Preprocess the face image into a 48x48x1 float32 array for the emotion model."""
     try:
         # Ensure the image is grayscale
         if len(face_img.shape) == 3:
@@ -63,165 +274,582 @@ def preprocess_face(face_img):
             gray = face_img
         # Resize to 48x48 pixels
         resized = cv2.resize(gray, (48, 48))
-        # Normalize pixel values to [0, 1]
-        normalized = resized / 255.0
-        # Add batch and channel dimensions
-        preprocessed = np.expand_dims(np.expand_dims(normalized, -1), 0)
-        return preprocessed
+        # Normalize pixel values to [0, 1] and add the channel dimension
+        normalized = resized.astype(np.float32) / 255.0
+        return normalized[..., np.newaxis]
     except Exception as e:
         logger.error(f"Error preprocessing face: {str(e)}")
         return None
 
+def detect_faces(image_data, tracker=None):
+    """Detect faces in an image and return their preprocessed crops.
+
+    Video frames pass a FaceTracker so faces are followed between keyframes
+    instead of being re-detected on the full frame every time.
+    """
+    with stage("detect", emotion_stage_latency):
+        gray = cv2.cvtColor(image_data, cv2.COLOR_BGR2GRAY)
+        if tracker is not None:
+            faces = tracker.detect(gray)
+        else:
+            faces = thread_cascade().detectMultiScale(gray, 1.1, 4)
+    logger.info(f"Detected {len(faces)} faces in the image")
+
+    crops = []
+    with stage("preprocess", emotion_stage_latency):
+        for (x, y, w, h) in faces:
+            preprocessed = preprocess_face(gray[y:y+h, x:x+w])
+            if preprocessed is not None:
+                crops.append(preprocessed)
+    return crops
+
+def predict_batch(crops):
+    """Run the emotion model over a list of preprocessed crops via the micro-batch scheduler."""
+    if len(crops) == 0:
+        return np.empty((0, len(emotion_dict)), dtype=np.float32)
+
+    # One contiguous float32 buffer for the whole request
+    batch = np.ascontiguousarray(np.stack(crops), dtype=np.float32)
+    with stage("inference", emotion_stage_latency):
+        predictions = batch_scheduler.predict(batch)
+    logger.info(f"Ran emotion model on {len(batch)} faces")
+    return predictions
+
+async def predict_crops(crops):
+    """Async predict_batch: waits for the micro-batch scheduler on the event loop.
+
+    Callers don't hold an inference executor thread while their crops wait to be
+    batched, so crops from any number of concurrent requests can share a batch.
+    """
+    if len(crops) == 0:
+        return np.empty((0, len(emotion_dict)), dtype=np.float32)
+
+    batch = np.ascontiguousarray(np.stack(crops), dtype=np.float32)
+    with stage("inference", emotion_stage_latency):
+        predictions = await asyncio.wrap_future(batch_scheduler.submit(batch))
+    logger.info(f"Ran emotion model on {len(batch)} faces")
+    return predictions
+
+def scores_from_predictions(predictions):
+    """Average per-face predictions into a dict of emotion scores."""
+    if len(predictions) == 0:
+        return {}
+    avg_prediction = np.mean(predictions, axis=0)
+    return {emotion_dict[i]: float(avg_prediction[i]) for i in range(7)}
+
+def _process_image_sync(image_data):
+    """Blocking implementation of process_image."""
+    try:
+        crops = detect_faces(image_data)
+        if not crops:
+            logger.warning("No faces detected in the image")
+            return {}
+
+        emotion_scores = scores_from_predictions(predict_batch(crops))
+        dominant_emotion = max(emotion_scores, key=emotion_scores.get)
+        logger.info(f"Average emotion scores for image: {emotion_scores}")
+        logger.info(f"Dominant emotion for image: {dominant_emotion} with probability {emotion_scores[dominant_emotion]:.4f}")
+        return emotion_scores
+    except Exception as e:
+        logger.error(f"Error in image processing: {str(e)}")
+        return {}
+
 async def process_image(image_data):
     """Process the image to detect faces and predict emotions using the model."""
     try:
-        gray = cv2.cvtColor(image_data, cv2.COLOR_BGR2GRAY)
-        faces = face_cascade.detectMultiScale(gray, 1.1, 4)
-        logger.info(f"Detected {len(faces)} faces in the image")
-        
-        if len(faces) == 0:
+        # Only detection occupies the inference executor; batching waits on the event loop
+        crops = await inference_executor.run(detect_faces, image_data)
+        if not crops:
             logger.warning("No faces detected in the image")
             return {}
-        
-        predictions = []
-        for (x, y, w, h) in faces:
-            face = gray[y:y+h, x:x+w]
-            preprocessed = preprocess_face(face)
-            if preprocessed is not None:
-                prediction = emotion_model.predict(preprocessed)[0]
-                dominant_emotion_idx = np.argmax(prediction)
-                dominant_emotion = emotion_dict[dominant_emotion_idx]
-                confidence = float(prediction[dominant_emotion_idx])
-                logger.info(f"Face at ({x}, {y}, {w}, {h}): Predicted {dominant_emotion} with confidence {confidence:.4f}")
-                predictions.append(prediction)
-        
-        if predictions:
-            avg_prediction = np.mean(predictions, axis=0)
-            emotion_scores = {emotion_dict[i]: float(avg_prediction[i]) for i in range(7)}
-            dominant_emotion = max(emotion_scores, key=emotion_scores.get)
-            logger.info(f"Average emotion scores for image: {emotion_scores}")
-            logger.info(f"Dominant emotion for image: {dominant_emotion} with probability {emotion_scores[dominant_emotion]:.4f}")
-            return emotion_scores
-        else:
-            return {}
+        return scores_from_predictions(await predict_crops(crops))
+    except InferenceQueueFull:
+        raise
     except Exception as e:
         logger.error(f"Error in image processing: {str(e)}")
         return {}
 
-async def extract_frames(video_path, num_frames=10):
-    """Extract frames from a video for emotion analysis."""
+def _extract_frames_sync(video_path, num_frames=NUM_FRAMES, interval_seconds=FRAME_INTERVAL_SECONDS):
+    """Blocking implementation of extract_frames."""
     frames = []
     try:
-        cap = cv2.VideoCapture(video_path)
-        total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
-        interval = max(1, total_frames // num_frames)
-        
-        for i in range(0, total_frames, interval):
-            cap.set(cv2.CAP_PROP_POS_FRAMES, i)
-            ret, frame = cap.read()
-            if ret and len(frames) < num_frames:
-                frames.append(frame)
-        cap.release()
+        frames = sample_frames(video_path, num_frames, interval_seconds)
         logger.info(f"Extracted {len(frames)} frames from video: {video_path}")
     except Exception as e:
         logger.error(f"Error extracting frames from {video_path}: {str(e)}")
     return frames
 
+async def extract_frames(video_path, num_frames=NUM_FRAMES, interval_seconds=FRAME_INTERVAL_SECONDS):
+    """Extract frames from a video for emotion analysis."""
+    return await inference_executor.run(_extract_frames_sync, video_path, num_frames, interval_seconds)
+
+def is_video(filename):
+    return filename.lower().endswith(VIDEO_EXTENSIONS)
+
+def decode_image(content):
+    """Decode an image straight from its upload buffer."""
+    return cv2.imdecode(np.frombuffer(content, dtype=np.uint8), cv2.IMREAD_COLOR)
+
+async def read_upload(file):
+    """Read an image upload into memory, enforcing MAX_UPLOAD_BYTES; returns (content, sha256)."""
+    content = await file.read(MAX_UPLOAD_BYTES + 1)
+    if len(content) > MAX_UPLOAD_BYTES:
+        raise HTTPException(status_code=413, detail=f"File {file.filename} exceeds the upload size limit")
+    return content, hashlib.sha256(content).hexdigest()
+
+async def spool_upload(file, spool_dir=VIDEO_SPOOL_DIR):
+    """Stream an upload into spool_dir; used for videos, since OpenCV can only open them by path.
+
+    Returns (path, sha256) so the content hash comes for free while spooling.
+    """
+    fd, path = tempfile.mkstemp(suffix=os.path.splitext(file.filename)[1], dir=spool_dir)
+    digest = hashlib.sha256()
+    size = 0
+    loop = asyncio.get_running_loop()
+    try:
+        with os.fdopen(fd, "wb") as buffer:
+            def write_chunk(chunk):
+                digest.update(chunk)
+                buffer.write(chunk)
+
+            while True:
+                chunk = await file.read(SPOOL_CHUNK_BYTES)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if size > MAX_UPLOAD_BYTES:
+                    raise HTTPException(status_code=413, detail=f"File {file.filename} exceeds the upload size limit")
+                # Disk writes (job uploads are not on /dev/shm) and hashing stay off the event loop
+                await loop.run_in_executor(None, write_chunk, chunk)
+    except BaseException:
+        os.remove(path)
+        raise
+    return path, digest.hexdigest()
+
+def detect_files(uploads, progress=None):
+    """Decode uploads and detect faces; returns (crops, owners) with the (file, frame) of every crop.
+
+    `uploads` is a list of (filename, data) where data is the raw bytes of an
+    image or the spooled path of a video. `progress(frames_done, frames_total)`
+    is called after each frame's face detection when given.
+    Blocking: meant to be run on the inference executor.
+    """
+    # Decode everything first so the total frame count is known for progress reporting
+    decoded = []
+    for filename, data in uploads:
+        logger.info(f"Processing file: {filename}")
+        if is_video(filename):
+            with stage("frame_extraction", emotion_stage_latency):
+                decoded.append(_extract_frames_sync(data))
+        else:
+            with stage("decode", emotion_stage_latency):
+                img = decode_image(data)
+            decoded.append([img] if img is not None else [])
+    frames_total = sum(len(frames) for frames in decoded)
+    frames_done = 0
+
+    # Collect every face crop of the request, remembering the (file, frame) it came from
+    crops = []
+    owners = []
+    for file_idx, ((filename, _), frames) in enumerate(zip(uploads, decoded)):
+        tracker = None
+        if is_video(filename):
+            tracker = FaceTracker(thread_cascade(), TRACK_KEYFRAME_INTERVAL, DETECT_MAX_WIDTH)
+
+        for frame_idx, frame in enumerate(frames):
+            logger.info(f"Detecting faces in frame {frame_idx+1}/{len(frames)} from {filename}")
+            try:
+                frame_crops = detect_faces(frame, tracker)
+                crops.extend(frame_crops)
+                owners.extend([(file_idx, frame_idx)] * len(frame_crops))
+            except Exception as e:
+                logger.error(f"Error in image processing: {str(e)}")
+            frames_done += 1
+            if progress is not None:
+                progress(frames_done, frames_total)
+        if tracker is not None:
+            logger.info(f"Face tracking for {filename}: {tracker.full_detections} full detections, {tracker.roi_detections} tracked frames")
+    return crops, owners
+
+def frame_scores(file_count, owners, predictions):
+    """Map predictions back to their frames; returns one list of per-frame emotion scores per file."""
+    per_frame = {}
+    for owner, prediction in zip(owners, predictions):
+        per_frame.setdefault(owner, []).append(prediction)
+    per_file = [[] for _ in range(file_count)]
+    for file_idx, frame_idx in sorted(per_frame):
+        per_file[file_idx].append(scores_from_predictions(per_frame[(file_idx, frame_idx)]))
+    return per_file
+
+async def score_uploads(uploads, cache_keys, progress=None):
+    """Per-frame emotion scores for all uploads, answering repeated content from the result cache."""
+    # Re-uploaded content is answered from the cache without touching OpenCV or the model
+    per_file = [await result_cache.get(key) for key in cache_keys]
+    misses = [idx for idx, scores in enumerate(per_file) if scores is None]
+    if misses:
+        # Decoding and detection run on the inference executor, then one batched inference pass
+        crops, owners = await inference_executor.run(detect_files, [uploads[idx] for idx in misses], progress)
+        results = frame_scores(len(misses), owners, await predict_crops(crops))
+        for idx, scores in zip(misses, results):
+            per_file[idx] = scores
+            await result_cache.set(cache_keys[idx], scores)
+    else:
+        logger.info("All uploaded files answered from the result cache")
+    return [scores for file_scores in per_file for scores in file_scores]
+
+def average_scores(all_scores):
+    """Average per-frame scores across all detections."""
+    emotions = all_scores[0].keys()
+    avg_scores = {emotion: np.mean([s[emotion] for s in all_scores]) for emotion in emotions}
+    
+    # Log final results
+    dominant_emotion = max(avg_scores, key=avg_scores.get)
+    logger.info(f"Final averaged emotion scores: {avg_scores}")
+    logger.info(f"Overall dominant emotion: {dominant_emotion} with probability {avg_scores[dominant_emotion]:.4f}")
+    return avg_scores
+
+async def save_analysis(user_id, username, avg_scores, filenames):
+    """Store an emotion analysis record; returns its inserted id."""
+    analysis_collection = DatabaseConnection.get_collection("emotion_analyses")
+    analysis_data = {
+        "user_id": str(user_id),
+        "username": username,
+        "timestamp": datetime.now(),
+        "scores": avg_scores,
+        "type": "video" if is_video(filenames[0]) else "images",
+        "filenames": filenames,
+    }
+    with stage("mongo_insert", emotion_stage_latency):
+        result = await analysis_collection.insert_one(analysis_data)
+    logger.info(f"Emotion analysis saved to database for user: {username}")
+    # Keep the per-day / per-week trend rollups current; a failure here must not lose the analysis
+    try:
+        with stage("rollup_update", emotion_stage_latency):
+            await record_analysis(DatabaseConnection.get_database(), analysis_data)
+    except Exception as e:
+        logger.error(f"Error updating emotion rollups: {str(e)}")
+    return result.inserted_id
+
 @router.post("/emotion/analysis")
 async def emotion_analysis(
     files: List[UploadFile] = File(...),
     current_user: dict = Depends(get_current_user),
 ):
     """Analyze emotions from uploaded images or videos."""
-    if emotion_model is None or face_cascade is None:
+    request_start = time.perf_counter()
+    if not await ensure_model_loaded():
         logger.error("Model or cascade not loaded")
         raise HTTPException(status_code=500, detail="Model or cascade not loaded")
 
+    spooled_paths = []
     try:
-        with tempfile.TemporaryDirectory() as temp_dir:
-            all_scores = []
-            for file in files:
-                file_path = os.path.join(temp_dir, file.filename)
-                with open(file_path, "wb") as buffer:
-                    content = await file.read()
-                    buffer.write(content)
-                
-                logger.info(f"Processing file: {file.filename}")
-                if file.filename.lower().endswith(('.mp4', '.avi', '.mov')):
-                    frames = await extract_frames(file_path)
-                    for i, frame in enumerate(frames):
-                        logger.info(f"Analyzing frame {i+1}/{len(frames)} from {file.filename}")
-                        scores = await process_image(frame)
-                        if scores:
-                            all_scores.append(scores)
+        # Images stay in memory; only videos touch the spool directory
+        uploads = []
+        cache_keys = []
+        for file in files:
+            with stage("upload_read", emotion_stage_latency):
+                if is_video(file.filename):
+                    path, content_hash = await spool_upload(file)
+                    spooled_paths.append(path)
+                    uploads.append((file.filename, path))
                 else:
-                    img = cv2.imread(file_path)
-                    scores = await process_image(img)
-                    if scores:
-                        all_scores.append(scores)
-            
-            if not all_scores:
-                logger.warning("No valid emotion scores obtained from the uploaded files")
-                raise HTTPException(
-                    status_code=400,
-                    detail="No faces detected in the content or unsupported file format.",
-                )
-            
-            # Average the scores across all detections
-            emotions = all_scores[0].keys()
-            avg_scores = {emotion: np.mean([s[emotion] for s in all_scores]) for emotion in emotions}
-            
-            # Log final results
-            dominant_emotion = max(avg_scores, key=avg_scores.get)
-            logger.info(f"Final averaged emotion scores: {avg_scores}")
-            logger.info(f"Overall dominant emotion: {dominant_emotion} with probability {avg_scores[dominant_emotion]:.4f}")
-            
-            # Save to database
-            analysis_collection = DatabaseConnection.get_collection("emotion_analyses")
-            analysis_data = {
-                "user_id": str(current_user["_id"]),
-                "username": current_user["username"],
-                "timestamp": datetime.now(),
-                "scores": avg_scores,
-                "type": "video" if files[0].filename.lower().endswith(('.mp4', '.avi', '.mov')) else "images",
-                "filenames": [file.filename for file in files],
-            }
-            analysis_collection.insert_one(analysis_data)
-            logger.info(f"Emotion analysis saved to database for user: {current_user['username']}")
-            
-            return {
-                "status": "success",
-                "message": "Facial analysis completed",
-                "scores": avg_scores,
-                "username": current_user["username"],
-            }
+                    content, content_hash = await read_upload(file)
+                    uploads.append((file.filename, content))
+            cache_keys.append(ResultCache.make_key(content_hash, model_version))
+
+        all_scores = await score_uploads(uploads, cache_keys)
+        
+        if not all_scores:
+            logger.warning("No valid emotion scores obtained from the uploaded files")
+            raise HTTPException(
+                status_code=400,
+                detail="No faces detected in the content or unsupported file format.",
+            )
+        
+        avg_scores = average_scores(all_scores)
+        await save_analysis(current_user["_id"], current_user["username"], avg_scores, [file.filename for file in files])
+        if lifecycle_stats["first_request_seconds"] is None:
+            lifecycle_stats["first_request_seconds"] = time.perf_counter() - request_start
+        
+        return FastJSONResponse({
+            "status": "success",
+            "message": "Facial analysis completed",
+            "scores": avg_scores,
+            "username": current_user["username"],
+        })
+    except HTTPException:
+        raise
+    except InferenceQueueFull as e:
+        logger.warning(str(e))
+        raise HTTPException(status_code=503, detail="Emotion analysis is busy, please retry shortly")
     except Exception as e:
         logger.error(f"Error in emotion analysis: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        for path in spooled_paths:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+def read_file(path):
+    with open(path, "rb") as f:
+        return f.read()
+
+async def process_emotion_job(job):
+    """JobQueue handler: run a queued analysis and return the fields to store on the job."""
+    job_id = job["_id"]
+    loop = asyncio.get_running_loop()
+    if not await ensure_model_loaded():
+        raise RuntimeError("Model or cascade not loaded")
+    last_report = [0.0]
+
+    def report_progress(frames_done, frames_total):
+        # Called from the inference thread; throttle writes to a few per second
+        now = time.monotonic()
+        if frames_done == frames_total or now - last_report[0] >= JOB_PROGRESS_INTERVAL:
+            last_report[0] = now
+            asyncio.run_coroutine_threadsafe(
+                emotion_jobs.update(job_id, {"frames_done": frames_done, "frames_total": frames_total}),
+                loop
+            )
+
+    uploads = []
+    for stored in job["files"]:
+        if is_video(stored["filename"]):
+            uploads.append((stored["filename"], stored["path"]))
+        else:
+            uploads.append((stored["filename"], await loop.run_in_executor(None, read_file, stored["path"])))
+    cache_keys = [ResultCache.make_key(stored["sha256"], model_version) for stored in job["files"]]
+
+    while True:
+        try:
+            all_scores = await score_uploads(uploads, cache_keys, report_progress)
+            break
+        except InferenceQueueFull:
+            # Interactive requests have priority; wait for room on the executor,
+            # keeping the heartbeat fresh so the sweep does not requeue the job
+            await emotion_jobs.update(job_id, {})
+            await asyncio.sleep(1)
+
+    if not all_scores:
+        raise ValueError("No faces detected in the content or unsupported file format.")
+
+    avg_scores = average_scores(all_scores)
+    filenames = [stored["filename"] for stored in job["files"]]
+    analysis_id = await save_analysis(job["user_id"], job["username"], avg_scores, filenames)
+    return {"scores": {k: float(v) for k, v in avg_scores.items()}, "analysis_id": str(analysis_id)}
+
+def _remove_files(paths):
+    for path in paths:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+async def remove_job_files(job):
+    """Delete a finished job's uploads; jobs interrupted by a shutdown keep them for the restart."""
+    paths = [stored["path"] for stored in job["files"]]
+    await asyncio.get_running_loop().run_in_executor(None, _remove_files, paths)
+
+emotion_jobs = JobQueue(
+    "emotion_jobs", process_emotion_job, DatabaseConnection.get_collection, on_finished=remove_job_files
+)
+
+@router.post("/emotion/jobs", status_code=202)
+async def submit_emotion_job(
+    files: List[UploadFile] = File(...),
+    current_user: dict = Depends(get_current_user),
+):
+    """Queue an emotion analysis and return its job id immediately."""
+    if not await ensure_model_loaded():
+        logger.error("Model or cascade not loaded")
+        raise HTTPException(status_code=500, detail="Model or cascade not loaded")
+
+    os.makedirs(JOB_UPLOAD_DIR, exist_ok=True)
+    stored_files = []
+    try:
+        for file in files:
+            with stage("upload_read", emotion_stage_latency):
+                path, content_hash = await spool_upload(file, JOB_UPLOAD_DIR)
+            stored_files.append({"filename": file.filename, "path": path, "sha256": content_hash})
+
+        job_id = await emotion_jobs.create({
+            "user_id": str(current_user["_id"]),
+            "username": current_user["username"],
+            "files": stored_files,
+            "frames_done": 0,
+            "frames_total": None,
+        })
+    except Exception as e:
+        for stored in stored_files:
+            try:
+                os.remove(stored["path"])
+            except OSError:
+                pass
+        if isinstance(e, HTTPException):
+            raise
+        logger.error(f"Error submitting emotion job: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+    logger.info(f"Queued emotion job {job_id} for user: {current_user['username']}")
+    return {"status": "queued", "job_id": str(job_id)}
+
+@router.get("/emotion/jobs/{job_id}")
+async def get_emotion_job(
+    job_id: str,
+    wait: float = 0,
+    current_user: dict = Depends(get_current_user),
+):
+    """Job status and progress; with wait > 0, long-poll until it changes or wait seconds pass."""
+    if not ObjectId.is_valid(job_id):
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    async def fetch():
+        return await emotion_jobs.collection.find_one(
+            {"_id": ObjectId(job_id), "user_id": str(current_user["_id"])},
+            {"files": 0}
+        )
+
+    job = await fetch()
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    deadline = time.monotonic() + min(max(wait, 0), JOB_MAX_WAIT_SECONDS)
+    seen = (job["status"], job.get("frames_done"))
+    while job["status"] in ("queued", "running") and time.monotonic() < deadline:
+        await asyncio.sleep(JOB_POLL_INTERVAL)
+        job = await fetch()
+        if (job["status"], job.get("frames_done")) != seen:
+            break
+
+    return FastJSONResponse({
+        "job_id": job_id,
+        "status": job["status"],
+        "frames_done": job.get("frames_done", 0),
+        "frames_total": job.get("frames_total"),
+        "scores": job.get("scores"),
+        "analysis_id": job.get("analysis_id"),
+        "error": job.get("error"),
+        "created_at": job["created_at"],
+        "updated_at": job["updated_at"],
+    })
+
+def encode_status_cursor(doc):
+    """Opaque pagination cursor pointing just after doc in (timestamp, _id) descending order."""
+    raw = f"{doc['timestamp'].isoformat()}|{doc['_id']}"
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii")
+
+def decode_status_cursor(cursor):
+    try:
+        timestamp, object_id = base64.urlsafe_b64decode(cursor.encode("ascii")).decode("utf-8").split("|")
+        return datetime.fromisoformat(timestamp), ObjectId(object_id)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+def status_projection(fields):
+    """Mongo projection for a comma separated field list; _id and timestamp are always kept for the cursor."""
+    if not fields:
+        return None
+    requested = {field.strip() for field in fields.split(",") if field.strip()}
+    unknown = requested - STATUS_FIELDS
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(sorted(unknown))}")
+    return {field: 1 for field in requested | {"_id", "timestamp"}}
 
 @router.get("/emotion/status")
-async def get_emotion_status(current_user: dict = Depends(get_current_user)):
-    """Retrieve all emotion analysis data for the current user."""
+async def get_emotion_status(
+    limit: int = Query(STATUS_PAGE_SIZE, ge=1, le=STATUS_MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+    stream: bool = False,
+    current_user: dict = Depends(get_current_user),
+):
+    """Retrieve the current user's emotion analyses, newest first.
+
+    Results are paginated by `cursor` (the `next_cursor` of the previous page) and can be
+    limited to a comma separated list of `fields`. With `stream=true` every remaining
+    document is written as NDJSON while the database cursor yields it.
+    """
     try:
+        query = {"user_id": str(current_user["_id"])}
+        if cursor:
+            timestamp, object_id = decode_status_cursor(cursor)
+            query["$or"] = [
+                {"timestamp": {"$lt": timestamp}},
+                {"timestamp": timestamp, "_id": {"$lt": object_id}},
+            ]
+
         analysis_collection = DatabaseConnection.get_collection("emotion_analyses")
-        emotion_data = list(analysis_collection.find({"user_id": str(current_user["_id"])}))
+        db_cursor = analysis_collection.find(query, status_projection(fields)).sort(
+            [("timestamp", -1), ("_id", -1)]
+        )
+
+        if stream:
+            async def ndjson():
+                async for doc in db_cursor.batch_size(STATUS_PAGE_SIZE):
+                    yield dumps(doc) + b"\n"
+
+            return StreamingResponse(ndjson(), media_type="application/x-ndjson")
+
+        # Fetch one extra document to know whether another page exists
+        emotion_data = await db_cursor.limit(limit + 1).to_list(length=limit + 1)
         
-        if not emotion_data:
+        if not emotion_data and not cursor:
             raise HTTPException(status_code=404, detail="No emotion analyses found for the user")
 
-        for data in emotion_data:
-            data["_id"] = str(data["_id"])
+        next_cursor = None
+        if len(emotion_data) > limit:
+            emotion_data = emotion_data[:limit]
+            next_cursor = encode_status_cursor(emotion_data[-1])
 
         logger.info(f"Fetched {len(emotion_data)} emotion analysis records for user: {current_user['username']}")
-        return {
+        return FastJSONResponse({
             "status": "success",
             "message": "Emotion analysis data fetched successfully",
             "data": emotion_data,
-        }
+            "next_cursor": next_cursor,
+        })
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error fetching emotion status: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Error fetching emotion status: {str(e)}")
 
+@router.get("/emotion/scheduler-stats")
+async def get_scheduler_stats():
+    """Report micro-batch scheduler queue depth and batch-size statistics."""
+    if batch_scheduler is None:
+        raise HTTPException(status_code=503, detail="Model not loaded")
+    return batch_scheduler.stats()
+
+@router.get("/emotion/trends")
+async def get_emotion_trends(
+    period: str = Query("day", pattern="^(day|week)$"),
+    limit: int = Query(30, ge=1, le=366),
+    current_user: dict = Depends(get_current_user),
+):
+    """Average scores and dominant-emotion counts per day or week, read only from the rollups."""
+    try:
+        rollup_collection = DatabaseConnection.get_collection(ROLLUP_COLLECTION)
+        rollups = await rollup_collection.find(
+            {"user_id": str(current_user["_id"]), "period": period}
+        ).sort("bucket_start", -1).limit(limit).to_list(length=limit)
+
+        return FastJSONResponse({
+            "status": "success",
+            "period": period,
+            "data": [rollup_to_trend(doc) for doc in reversed(rollups)],
+        })
+    except Exception as e:
+        logger.error(f"Error fetching emotion trends: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error fetching emotion trends: {str(e)}")
+
+@router.get("/emotion/cache-stats")
+async def get_cache_stats():
+    """Report emotion result cache hit and miss counts."""
+    return result_cache.stats()
+
 @router.get("/emotion/test-data")
 async def get_emotion_test_data(email: str):
     """Retrieve the latest emotion analysis data for a user by email."""
@@ -232,11 +860,11 @@ async def get_emotion_test_data(email: str):
         user_collection = DatabaseConnection.get_collection('users')
         emotion_collection = DatabaseConnection.get_collection('emotion_analyses')
 
-        user = user_collection.find_one({"email": email})
+        user = await user_collection.find_one({"email": email})
         if not user:
             raise HTTPException(status_code=404, detail="User not found")
 
-        emotion_data = emotion_collection.find_one(
+        emotion_data = await emotion_collection.find_one(
             {"user_id": str(user["_id"])},
             sort=[("timestamp", -1)]
         )
@@ -245,12 +873,12 @@ async def get_emotion_test_data(email: str):
             raise HTTPException(status_code=404, detail="No emotion data found")
 
         logger.info(f"Fetched latest emotion data for email: {email}")
-        return {
+        return FastJSONResponse({
             "scores": emotion_data["scores"],
             "type": emotion_data["type"],
             "filenames": emotion_data["filenames"],
             "timestamp": emotion_data["timestamp"]
-        }
+        })
     except Exception as e:
         logger.error(f"Error fetching emotion test data: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
@@ -2,7 +2,7 @@ from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from pymongo.errors import DuplicateKeyError
 from bson import ObjectId
-from security import decode_token
+from security import decode_token, is_admin
 from db.mongo import DatabaseConnection
 from schemas.userSchema import UserCreate, UserLogin, UserInDB
 from security import (
@@ -12,20 +12,34 @@ from security import (
     decode_token  # Add this import
 )
 from security import get_password_hash, verify_password, create_access_token
+from security import get_password_hash_async, verify_and_update_password_async
 from db.mongo import DatabaseConnection
+from services.ttl_cache import TTLCache
+from services.request_timing import stage
+import os
 
 router = APIRouter()
 
 # OAuth2 scheme
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="login")
 
+# Authenticated user documents keyed by token subject (user id)
+user_cache = TTLCache(
+    max_size=int(os.getenv('USER_CACHE_SIZE', '10000')),
+    ttl=float(os.getenv('USER_CACHE_TTL_SECONDS', '60'))
+)
+
+def invalidate_user(user_id):
+    """Drop a user from the cache; call after any write to that user's document."""
+    user_cache.invalidate(str(user_id))
+
 @router.post("/register")
 async def register_user(user: UserCreate):
     # Get users collection
     users_collection = DatabaseConnection.get_collection('users')
     
     # Check if user already exists
-    existing_user = users_collection.find_one({"$or": [
+    existing_user = await users_collection.find_one({"$or": [
         {"email": user.email},
         {"username": user.username}
     ]})
@@ -37,7 +51,7 @@ async def register_user(user: UserCreate):
         )
     
     # Create user document
-    hashed_password = get_password_hash(user.password)
+    hashed_password = await get_password_hash_async(user.password)
     user_doc = {
         "username": user.username,
         "email": user.email,
@@ -47,7 +61,7 @@ async def register_user(user: UserCreate):
     
     try:
         # Insert user
-        result = users_collection.insert_one(user_doc)
+        result = await users_collection.insert_one(user_doc)
         
         # Create access token
         access_token = create_access_token(
@@ -71,7 +85,7 @@ async def login_user(user: UserLogin):
     users_collection = DatabaseConnection.get_collection('users')
     
     # Find user by email
-    db_user = users_collection.find_one({"email": user.email})
+    db_user = await users_collection.find_one({"email": user.email})
     
     if not db_user:
         raise HTTPException(
@@ -80,12 +94,21 @@ async def login_user(user: UserLogin):
         )
     
     # Verify password
-    if not verify_password(user.password, db_user['hashed_password']):
+    valid, new_hash = await verify_and_update_password_async(user.password, db_user['hashed_password'])
+    if not valid:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password"
         )
     
+    # Rehash with the current bcrypt cost
+    if new_hash:
+        await users_collection.update_one(
+            {"_id": db_user['_id']},
+            {"$set": {"hashed_password": new_hash}}
+        )
+        invalidate_user(db_user['_id'])
+    
     # Create access token
     access_token = create_access_token(
         data={"sub": str(db_user['_id'])}
@@ -99,8 +122,14 @@ async def login_user(user: UserLogin):
 # Dependency to get current user
 async def get_current_user(token: str = Depends(oauth2_scheme)):
     # Decode the token
-    payload = decode_token(token)
+    with stage("auth_decode"):
+        payload = decode_token(token)
     
+    # Serve repeat requests from the cache; misses fall through to the database
+    cached_user = user_cache.get(payload.get("sub"))
+    if cached_user is not None:
+        return dict(cached_user)
+
     # Get users collection
     users_collection = DatabaseConnection.get_collection('users')
     
@@ -109,7 +138,8 @@ async def get_current_user(token: str = Depends(oauth2_scheme)):
         user_id = ObjectId(payload.get("sub"))
         
         # Find user by ObjectId
-        user = users_collection.find_one({"_id": user_id})
+        with stage("auth_db"):
+            user = await users_collection.find_one({"_id": user_id})
         
         if not user:
             raise HTTPException(
@@ -119,8 +149,9 @@ async def get_current_user(token: str = Depends(oauth2_scheme)):
         
         # Convert ObjectId to string for JSON serialization
         user['_id'] = str(user['_id'])
+        user_cache.set(user['_id'], user)
         
-        return user
+        return dict(user)
     
     except Exception as e:
         raise HTTPException(
@@ -128,4 +159,18 @@ async def get_current_user(token: str = Depends(oauth2_scheme)):
             detail="Could not validate credentials"
         )
     
-    return user
\ No newline at end of file
+    return user
+
+# Dependency for admin-only endpoints
+async def require_admin(current_user: dict = Depends(get_current_user)):
+    if not is_admin(current_user["_id"]):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Admin privileges required"
+        )
+    return current_user
+
+@router.get("/cache-stats")
+async def get_user_cache_stats():
+    """Report hit rate of the authenticated-user cache."""
+    return user_cache.stats()
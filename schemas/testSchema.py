@@ -1,6 +1,7 @@
 # schemas/testSchema.py
 from pydantic import BaseModel
 from typing import List, Optional
+from datetime import datetime
 from bson import ObjectId
 
 class Question(BaseModel):
@@ -18,4 +19,10 @@ class QuestionSubmission(BaseModel):
     selected_answer: str
 
 class PersonalityTestSubmission(BaseModel):
-    questions_data: List[QuestionSubmission]
\ No newline at end of file
+    questions_data: List[QuestionSubmission]
+
+class BulkSubmissionItem(PersonalityTestSubmission):
+    # The student the result belongs to: one of email / user_id is required
+    email: Optional[str] = None
+    user_id: Optional[str] = None
+    submitted_at: Optional[datetime] = None
\ No newline at end of file
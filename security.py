@@ -1,13 +1,28 @@
 import os
 from datetime import datetime, timedelta
 from typing import Optional
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
 
 from jose import jwt
 from passlib.context import CryptContext
 from fastapi import HTTPException, status
 
 # Password hashing
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Stored hashes with a different cost are flagged by needs_update and rehashed on login
+BCRYPT_ROUNDS = int(os.getenv('BCRYPT_ROUNDS', '12'))
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__default_rounds=BCRYPT_ROUNDS,
+    bcrypt__min_rounds=BCRYPT_ROUNDS,
+    bcrypt__max_rounds=BCRYPT_ROUNDS
+)
+
+# bcrypt is CPU-bound; run it on a small dedicated pool so it never blocks the event loop.
+# The pool size is the cap on concurrent hash operations; extra requests wait their turn.
+HASH_WORKERS = int(os.getenv('HASH_WORKERS', '2'))
+_hash_executor = ThreadPoolExecutor(max_workers=HASH_WORKERS, thread_name_prefix="bcrypt")
 
 # JWT Configuration
 SECRET_KEY = os.getenv('JWT_SECRET_KEY')
@@ -20,12 +35,33 @@ if not SECRET_KEY:
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 
+# Users (by id) allowed to profile requests and download the profiles
+ADMIN_USER_IDS = frozenset(filter(None, (user_id.strip() for user_id in os.getenv('ADMIN_USER_IDS', '').split(','))))
+
+def is_admin(user_id):
+    return user_id is not None and str(user_id) in ADMIN_USER_IDS
+
+# Partner accounts allowed to upload results on behalf of students (admins always are)
+BULK_UPLOADER_USER_IDS = frozenset(filter(None, (user_id.strip() for user_id in os.getenv('BULK_UPLOADER_USER_IDS', '').split(','))))
+
+def is_bulk_uploader(user_id):
+    return is_admin(user_id) or (user_id is not None and str(user_id) in BULK_UPLOADER_USER_IDS)
+
 def verify_password(plain_password, hashed_password):
     return pwd_context.verify(plain_password, hashed_password)
 
 def get_password_hash(password):
     return pwd_context.hash(password)
 
+async def get_password_hash_async(password):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_hash_executor, get_password_hash, password)
+
+async def verify_and_update_password_async(plain_password, hashed_password):
+    """Verify off the event loop; returns (valid, new_hash) where new_hash is set when the stored cost is outdated."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_hash_executor, pwd_context.verify_and_update, plain_password, hashed_password)
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
     
@@ -0,0 +1,101 @@
+# Benchmark bulk cognitive submission ingestion.
+#
+# usage: python services/BenchmarkBulkSubmissions.py [--submissions 10000] [--with-db]
+# Without --with-db only validation and scoring are timed (per-item scoring vs. one
+# vectorized batch). With --with-db synthetic students are created in the database
+# from MONGO_URI, the full ingest path (lookups + chunked bulk inserts) is timed,
+# and everything it wrote is removed again.
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from db.mongo import DatabaseConnection
+from routes.cognitive import ingest_submissions, validate_bulk_item
+from services.cognitive_scoring import get_rules
+
+ANSWERS = ["Never", "Rarely", "Sometimes", "Often", "Always"]
+BENCH_PREFIX = "bulk-bench-"
+
+
+def make_submissions(count, students, questions=18):
+    rng = random.Random(0)
+    return [
+        {
+            "email": f"{BENCH_PREFIX}{i % students}@example.com",
+            "questions_data": [
+                {"question_id": q, "question_text": f"Question {q}", "selected_answer": rng.choice(ANSWERS)}
+                for q in range(1, questions + 1)
+            ],
+        }
+        for i in range(count)
+    ]
+
+
+def time_scoring(raw):
+    rules = get_rules()
+    start = time.perf_counter()
+    items = [validate_bulk_item(item) for item in raw]
+    validated = time.perf_counter()
+    pairs = [([q.question_id for q in item.questions_data], [q.selected_answer for q in item.questions_data]) for item in items]
+    for ids, answers in pairs:
+        rules.score(ids, answers)
+    one_by_one = time.perf_counter()
+    rules.score_batch(pairs)
+    batched = time.perf_counter()
+    return {
+        "validate_seconds": validated - start,
+        "score_one_by_one_seconds": one_by_one - validated,
+        "score_batch_seconds": batched - one_by_one,
+    }
+
+
+async def time_ingest(raw, students):
+    await DatabaseConnection.connect()
+    users = DatabaseConnection.get_collection("users")
+    results = DatabaseConnection.get_collection("cognitive_test_results")
+    try:
+        await users.insert_many([
+            {"username": f"{BENCH_PREFIX}{i}", "email": f"{BENCH_PREFIX}{i}@example.com", "hashed_password": "x"}
+            for i in range(students)
+        ])
+        start = time.perf_counter()
+        report = await ingest_submissions(raw, {"username": f"{BENCH_PREFIX}uploader"})
+        elapsed = time.perf_counter() - start
+        return {
+            "ingest_seconds": elapsed,
+            "submissions_per_second": len(raw) / elapsed,
+            "inserted": report["inserted"],
+            "failed": report["failed"],
+        }
+    finally:
+        await results.delete_many({"submitted_by": f"{BENCH_PREFIX}uploader"})
+        await users.delete_many({"username": {"$regex": f"^{BENCH_PREFIX}"}})
+        await DatabaseConnection.disconnect()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark bulk cognitive submission ingestion")
+    parser.add_argument("--submissions", type=int, default=10000)
+    parser.add_argument("--students", type=int, default=500)
+    parser.add_argument("--with-db", action="store_true")
+    parser.add_argument("--output", default=None, help="write results as JSON")
+    args = parser.parse_args()
+
+    raw = make_submissions(args.submissions, args.students)
+    results = {"submissions": args.submissions, "scoring": time_scoring(raw)}
+    if args.with_db:
+        results["ingest"] = asyncio.run(time_ingest(raw, args.students))
+
+    print(json.dumps(results, indent=2))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
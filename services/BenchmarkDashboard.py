@@ -0,0 +1,73 @@
+# Compare the dashboard's old three-call pattern with the combined /dashboard endpoint.
+#
+# usage: python services/BenchmarkDashboard.py --email someone@example.com [--repeats 50]
+# Calls the route handlers directly against the database in MONGO_URI, so the
+# numbers are database + handler time without HTTP overhead.
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from db.mongo import DatabaseConnection
+from routes.cognitive import get_cognitive_test_status, get_cognitive_test_data
+from routes.emotions import get_emotion_test_data
+from routes.dashboard import get_dashboard
+
+
+async def three_calls(email):
+    # The frontend issues these one after another
+    for handler in (get_cognitive_test_status, get_cognitive_test_data, get_emotion_test_data):
+        try:
+            await handler(email)
+        except Exception:
+            # 404s for users without results still cost the round trips
+            pass
+
+
+async def combined(email):
+    await get_dashboard(email)
+
+
+async def measure(fn, email, repeats):
+    await fn(email)  # warm the connection pool
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        await fn(email)
+        timings.append((time.perf_counter() - start) * 1000)
+    return {
+        "p50_ms": float(np.percentile(timings, 50)),
+        "p95_ms": float(np.percentile(timings, 95)),
+        "max_ms": float(np.max(timings)),
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Benchmark dashboard data loading")
+    parser.add_argument("--email", required=True)
+    parser.add_argument("--repeats", type=int, default=50)
+    parser.add_argument("--output", default=None, help="write results as JSON")
+    args = parser.parse_args()
+
+    await DatabaseConnection.connect()
+    try:
+        results = {
+            "three_calls": await measure(three_calls, args.email, args.repeats),
+            "dashboard": await measure(combined, args.email, args.repeats),
+        }
+    finally:
+        await DatabaseConnection.disconnect()
+
+    print(json.dumps(results, indent=2))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,85 @@
+# Compare the sequential frame sampler with the old seek-per-sample approach.
+#
+# usage: python services/BenchmarkFrameSampler.py [--video path.mp4] [--seconds 300]
+# Without --video a synthetic clip of the requested length is generated first.
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from services.frame_sampler import sample_frames
+
+
+def seek_sample_frames(video_path, num_frames=10):
+    """The previous extract_frames implementation: one CAP_PROP_POS_FRAMES seek per sample."""
+    frames = []
+    cap = cv2.VideoCapture(video_path)
+    total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    interval = max(1, total_frames // num_frames)
+    for i in range(0, total_frames, interval):
+        cap.set(cv2.CAP_PROP_POS_FRAMES, i)
+        ret, frame = cap.read()
+        if ret and len(frames) < num_frames:
+            frames.append(frame)
+    cap.release()
+    return frames
+
+
+def make_video(path, seconds, fps=30, size=(640, 480)):
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"mp4v"), fps, size)
+    rng = np.random.default_rng(0)
+    base = rng.integers(0, 255, (size[1], size[0], 3), dtype=np.uint8)
+    for i in range(seconds * fps):
+        # Shift the pattern every frame so the encoder has real work between keyframes
+        writer.write(np.roll(base, i, axis=1))
+    writer.release()
+
+
+def time_sampler(fn, video_path, num_frames, repeats):
+    timings = []
+    count = 0
+    for _ in range(repeats):
+        start = time.perf_counter()
+        count = len(fn(video_path, num_frames))
+        timings.append((time.perf_counter() - start) * 1000)
+    return {"median_ms": float(np.median(timings)), "min_ms": float(np.min(timings)), "frames": count}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark video frame samplers")
+    parser.add_argument("--video", default=None)
+    parser.add_argument("--seconds", type=int, default=300, help="length of the synthetic video")
+    parser.add_argument("--num-frames", type=int, default=10)
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--output", default=None, help="write results as JSON")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        video_path = args.video
+        if video_path is None:
+            video_path = os.path.join(temp_dir, "synthetic.mp4")
+            print(f"Generating {args.seconds}s synthetic video...")
+            make_video(video_path, args.seconds)
+
+        results = {
+            "video": args.video or f"synthetic {args.seconds}s",
+            "num_frames": args.num_frames,
+            "seek": time_sampler(seek_sample_frames, video_path, args.num_frames, args.repeats),
+            "sequential": time_sampler(sample_frames, video_path, args.num_frames, args.repeats),
+        }
+    results["speedup"] = results["seek"]["median_ms"] / max(results["sequential"]["median_ms"], 1e-9)
+
+    print(json.dumps(results, indent=2))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+# Measure login throughput with bcrypt verification inline on the event loop vs. on the hash pool.
+#
+# usage: python services/BenchmarkPasswordHashing.py [--logins 200] [--concurrency 50]
+# Alongside throughput it reports the worst event-loop stall, i.e. how long any
+# other request on the same worker would have waited.
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from security import BCRYPT_ROUNDS, HASH_WORKERS, get_password_hash, verify_password, verify_and_update_password_async
+
+
+async def heartbeat(stop, interval=0.005):
+    """Tick every `interval` seconds and record the largest observed delay."""
+    worst = 0.0
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        worst = max(worst, time.perf_counter() - start - interval)
+    return worst
+
+
+async def run(mode, hashed, logins, concurrency):
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def login():
+        async with semaphore:
+            if mode == "inline":
+                verify_password("correct horse", hashed)
+            else:
+                await verify_and_update_password_async("correct horse", hashed)
+
+    stop = asyncio.Event()
+    ticker = asyncio.create_task(heartbeat(stop))
+    await asyncio.sleep(0)
+    start = time.perf_counter()
+    await asyncio.gather(*(login() for _ in range(logins)))
+    elapsed = time.perf_counter() - start
+    stop.set()
+    worst_stall = await ticker
+    return {
+        "logins": logins,
+        "seconds": elapsed,
+        "logins_per_second": logins / elapsed,
+        "max_event_loop_stall_ms": worst_stall * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark bcrypt login verification")
+    parser.add_argument("--logins", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--output", default=None, help="write results as JSON")
+    args = parser.parse_args()
+
+    hashed = get_password_hash("correct horse")
+    results = {
+        "bcrypt_rounds": BCRYPT_ROUNDS,
+        "hash_workers": HASH_WORKERS,
+        "concurrency": args.concurrency,
+        "before_inline": asyncio.run(run("inline", hashed, args.logins, args.concurrency)),
+        "after_offloaded": asyncio.run(run("offloaded", hashed, args.logins, args.concurrency)),
+    }
+    print(json.dumps(results, indent=2))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
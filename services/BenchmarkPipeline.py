@@ -0,0 +1,108 @@
+# Microbenchmarks for the hot paths behind the API, without HTTP or MongoDB.
+#
+# usage: python services/BenchmarkPipeline.py [--repeats 50] [--faces DIR] [--seed 0]
+#            [--output-dir bench_results] [--baseline bench_results/pipeline-latest.json]
+# Times process_image and extract_frames (through the inference executor, as the
+# routes call them), generate_result for a full submission, and bcrypt hashing and
+# verification at BCRYPT_ROUNDS. Inputs are the same seeded synthetic faces/videos
+# the load test uploads. Results are written as JSON to --output-dir; with --baseline
+# the run exits non-zero when any p95 grew by more than --tolerance.
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from routes import emotions
+from routes.cognitive import generate_result
+from schemas.testSchema import QuestionSubmission
+from security import BCRYPT_ROUNDS, get_password_hash, verify_password
+from services.inference_executor import inference_executor
+from services.benchmark_support import (
+    make_answers, synthetic_face, write_video, load_faces, summarize, time_calls, write_results, compare_to_baseline,
+)
+
+
+async def time_async(fn, arg, repeats):
+    await fn(arg)
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        await fn(arg)
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+
+async def emotion_benchmarks(faces, video_path, repeats):
+    if not await emotions.ensure_model_loaded():
+        raise SystemExit("Emotion model or cascade failed to load")
+    faces_found = sum(bool(emotions._process_image_sync(face)) for face in faces)
+    image_timings = []
+    for face in faces:
+        image_timings.extend(await time_async(emotions.process_image, face, max(1, repeats // len(faces))))
+    return {
+        "model_backend": emotions.MODEL_BACKEND,
+        "images_with_faces": f"{faces_found}/{len(faces)}",
+        "process_image": summarize(image_timings),
+        "extract_frames": summarize(await time_async(emotions.extract_frames, video_path, repeats)),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Microbenchmark the emotion, scoring and password paths")
+    parser.add_argument("--repeats", type=int, default=50)
+    parser.add_argument("--faces", default=None, help="directory of real face images instead of synthetic ones")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output-dir", default="bench_results")
+    parser.add_argument("--baseline", default=None, help="earlier result file to compare p95 latencies against")
+    parser.add_argument("--tolerance", type=float, default=0.10)
+    args = parser.parse_args()
+
+    # Per-frame INFO logging would dominate the timings
+    logging.getLogger(emotions.__name__).setLevel(logging.WARNING)
+
+    rng = np.random.default_rng(args.seed)
+    faces = load_faces(args.faces) if args.faces else [synthetic_face(rng) for _ in range(8)]
+    workdir = tempfile.mkdtemp(prefix="pipeline-benchmark-")
+    try:
+        video_path = write_video(os.path.join(workdir, "clip.mp4"), faces[0])
+        inference_executor.start()
+        results = asyncio.run(emotion_benchmarks(faces, video_path, args.repeats))
+    finally:
+        inference_executor.shutdown()
+        if emotions.batch_scheduler is not None:
+            emotions.batch_scheduler.stop()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    questions = [QuestionSubmission(**item) for item in make_answers(random.Random(args.seed))]
+    results["generate_result"] = summarize(time_calls(lambda: generate_result(questions), args.repeats * 20))
+
+    hashed = get_password_hash("benchmark password")
+    results["bcrypt"] = {
+        "rounds": BCRYPT_ROUNDS,
+        "hash": summarize(time_calls(lambda: get_password_hash("benchmark password"), max(5, args.repeats // 5))),
+        "verify": summarize(time_calls(lambda: verify_password("benchmark password", hashed), max(5, args.repeats // 5))),
+    }
+
+    # Compare before writing, the baseline may be the -latest file about to be replaced
+    regressions = compare_to_baseline(results, args.baseline, tolerance=args.tolerance) if args.baseline else []
+    path = write_results(results, args.output_dir, "pipeline")
+
+    print(json.dumps(results, indent=2))
+    print(f"Results written to {path}")
+    for regression in regressions:
+        print(f"REGRESSION {regression['name']}: p95 {regression['baseline']:.1f}ms -> {regression['current']:.1f}ms ({regression['change']:+.0%})")
+    if regressions:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
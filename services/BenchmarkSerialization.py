@@ -0,0 +1,84 @@
+# Microbenchmark JSON serialization of a large /emotion/status payload.
+#
+# usage: python services/BenchmarkSerialization.py [--documents 5000] [--repeats 20]
+# "before" mirrors the old path: convert _id by hand, then FastAPI's
+# jsonable_encoder + json.dumps. "after" renders the raw documents with FastJSONResponse.
+import argparse
+import json
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+from bson import ObjectId
+from fastapi.encoders import jsonable_encoder
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from services.json_response import dumps
+
+EMOTIONS = ["Angry", "Disgusted", "Fearful", "Happy", "Neutral", "Sad", "Surprised"]
+
+
+def make_documents(count):
+    rng = np.random.default_rng(0)
+    now = datetime.utcnow()
+    user_id = str(ObjectId())
+    return [
+        {
+            "_id": ObjectId(),
+            "user_id": user_id,
+            "username": "benchmark",
+            "timestamp": now - timedelta(minutes=i),
+            # np.mean() results, as stored by emotion_analysis
+            "scores": {emotion: np.float64(value) for emotion, value in zip(EMOTIONS, rng.dirichlet(np.ones(7)))},
+            "type": "video",
+            "filenames": ["clip.mp4"],
+        }
+        for i in range(count)
+    ]
+
+
+def before(documents):
+    converted = [dict(doc, _id=str(doc["_id"])) for doc in documents]
+    payload = {"status": "success", "data": converted}
+    return json.dumps(jsonable_encoder(payload)).encode("utf-8")
+
+
+def after(documents):
+    return dumps({"status": "success", "data": documents})
+
+
+def time_it(fn, documents, repeats):
+    fn(documents)
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        body = fn(documents)
+        timings.append((time.perf_counter() - start) * 1000)
+    return {"median_ms": float(np.median(timings)), "bytes": len(body)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark /emotion/status serialization")
+    parser.add_argument("--documents", type=int, default=5000)
+    parser.add_argument("--repeats", type=int, default=20)
+    parser.add_argument("--output", default=None, help="write results as JSON")
+    args = parser.parse_args()
+
+    documents = make_documents(args.documents)
+    results = {
+        "documents": args.documents,
+        "before_jsonable_encoder": time_it(before, documents, args.repeats),
+        "after_orjson": time_it(after, documents, args.repeats),
+    }
+    results["speedup"] = results["before_jsonable_encoder"]["median_ms"] / max(results["after_orjson"]["median_ms"], 1e-9)
+
+    print(json.dumps(results, indent=2))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
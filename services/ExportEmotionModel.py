@@ -0,0 +1,134 @@
+# Export the trained emotion model to TFLite and check it against the Keras model.
+#
+# usage: python services/ExportEmotionModel.py --quantization int8 --data data/test
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+import tensorflow as tf
+from tensorflow.keras.models import model_from_json
+from tensorflow.keras.preprocessing.image import ImageDataGenerator
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from services.tflite_backend import TFLiteEmotionModel
+
+SERVICES_DIR = os.path.dirname(os.path.abspath(__file__))
+LATENCY_BATCH_SIZES = [1, 8, 32, 64]
+
+
+def load_keras_model():
+    with open(os.path.join(SERVICES_DIR, 'emotion_model.json'), 'r') as json_file:
+        model = model_from_json(json_file.read())
+    model.load_weights(os.path.join(SERVICES_DIR, 'emotion_model.weights.h5'))
+    return model
+
+
+def load_images(data_dir, limit):
+    """Load up to `limit` grayscale 48x48 images (rescaled to [0, 1]) from a class-per-folder directory."""
+    generator = ImageDataGenerator(rescale=1./255).flow_from_directory(
+        data_dir,
+        target_size=(48, 48),
+        batch_size=64,
+        color_mode="grayscale",
+        class_mode=None,
+        shuffle=False)
+    images = []
+    count = 0
+    for batch in generator:
+        images.append(batch.astype(np.float32))
+        count += len(batch)
+        if count >= limit or count >= generator.samples:
+            break
+    return np.concatenate(images)[:limit]
+
+
+def convert(model, quantization, calibration_images):
+    converter = tf.lite.TFLiteConverter.from_keras_model(model)
+    if quantization == "float16":
+        converter.optimizations = [tf.lite.Optimize.DEFAULT]
+        converter.target_spec.supported_types = [tf.float16]
+    elif quantization == "int8":
+        def representative_dataset():
+            for image in calibration_images:
+                yield [image[np.newaxis, ...]]
+        converter.optimizations = [tf.lite.Optimize.DEFAULT]
+        converter.representative_dataset = representative_dataset
+        converter.target_spec.supported_ops = [tf.lite.OpsSet.TFLITE_BUILTINS_INT8]
+        converter.inference_input_type = tf.int8
+        converter.inference_output_type = tf.int8
+    return converter.convert()
+
+
+def time_batches(predict_fn, images, repeats):
+    """Median latency in milliseconds of predict_fn for each batch size."""
+    latencies = {}
+    for batch_size in LATENCY_BATCH_SIZES:
+        batch = np.ascontiguousarray(np.resize(images, (batch_size, 48, 48, 1)), dtype=np.float32)
+        predict_fn(batch)  # warm-up / tensor allocation
+        timings = []
+        for _ in range(repeats):
+            start = time.perf_counter()
+            predict_fn(batch)
+            timings.append((time.perf_counter() - start) * 1000)
+        latencies[str(batch_size)] = float(np.median(timings))
+    return latencies
+
+
+def parity_report(keras_model, tflite_model, images, repeats):
+    keras_preds = np.concatenate([
+        np.asarray(keras_model.predict_on_batch(images[i:i + 64])) for i in range(0, len(images), 64)
+    ])
+    tflite_preds = np.concatenate([
+        tflite_model.predict_on_batch(images[i:i + 64]) for i in range(0, len(images), 64)
+    ])
+    return {
+        "samples": int(len(images)),
+        "top1_agreement": float(np.mean(np.argmax(keras_preds, axis=1) == np.argmax(tflite_preds, axis=1))),
+        "max_probability_drift": float(np.max(np.abs(keras_preds - tflite_preds))),
+        "mean_probability_drift": float(np.mean(np.abs(keras_preds - tflite_preds))),
+        "latency_ms": {
+            "keras": time_batches(lambda b: keras_model.predict_on_batch(b), images, repeats),
+            "tflite": time_batches(tflite_model.predict_on_batch, images, repeats),
+        },
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export the emotion model to TFLite and report parity with Keras")
+    parser.add_argument("--quantization", choices=["none", "float16", "int8"], default="none")
+    parser.add_argument("--output", default=os.path.join(SERVICES_DIR, "emotion_model.tflite"))
+    parser.add_argument("--data", default="data/test", help="held-out images used for parity checks")
+    parser.add_argument("--calibration-data", default="data/train", help="images used to calibrate int8 quantization")
+    parser.add_argument("--samples", type=int, default=1000)
+    parser.add_argument("--repeats", type=int, default=20)
+    parser.add_argument("--report", default=None, help="where to write the JSON parity report")
+    args = parser.parse_args()
+
+    keras_model = load_keras_model()
+    calibration_images = None
+    if args.quantization == "int8":
+        calibration_images = load_images(args.calibration_data, 200)
+
+    tflite_bytes = convert(keras_model, args.quantization, calibration_images)
+    with open(args.output, "wb") as f:
+        f.write(tflite_bytes)
+    print(f"Wrote {args.output} ({len(tflite_bytes) / 1024:.1f} KiB, quantization={args.quantization})")
+
+    images = load_images(args.data, args.samples)
+    report = parity_report(keras_model, TFLiteEmotionModel(args.output), images, args.repeats)
+    report["quantization"] = args.quantization
+    report["model_path"] = args.output
+    report["model_size_bytes"] = len(tflite_bytes)
+
+    report_path = args.report or os.path.splitext(args.output)[0] + ".parity.json"
+    with open(report_path, "w") as f:
+        json.dump(report, f, indent=2)
+    print(json.dumps(report, indent=2))
+    print(f"Parity report written to {report_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,493 @@
+# Load test the API end to end against a throwaway local MongoDB.
+#
+# usage: python services/LoadBenchmark.py [--requests 2000] [--concurrency 16] [--users 50] [--seed 0]
+#            [--mix login=10,questions=20,...] [--mongo-uri URI | --mongod PATH] [--faces DIR]
+#            [--output-dir bench_results] [--baseline bench_results/load-latest.json]
+# Without --mongo-uri a mongod from PATH is started on a free port with a temporary
+# dbpath, and removed afterwards. The app runs under uvicorn in a subprocess, is seeded
+# with a question set and --users registered users, and is then driven by --concurrency
+# keep-alive clients picking routes from --mix. Throughput and p50/p95/p99 per route are
+# written as JSON (plus the app's /metrics scrape) to --output-dir; with --baseline the
+# run exits non-zero when any route's p95 grew by more than --tolerance.
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import random
+import shutil
+import signal
+import socket
+import struct
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from collections import Counter, defaultdict
+
+import numpy as np
+from pymongo import MongoClient
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from services.benchmark_support import (
+    REPO_ROOT, TEST_TYPE, make_question_set, make_answers, synthetic_face, encode_jpeg,
+    write_video, load_faces, summarize, write_results, compare_to_baseline,
+)
+
+DEFAULT_MIX = "login=10,questions=20,submit=10,emotion_image=10,emotion_video=3,status=25,dashboard=15,register=2"
+PASSWORD = "load-benchmark-password"
+DATABASE = "college_project"
+
+
+# Processes
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def wait_for_port(port, process, timeout):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"{process.args[0]} exited with code {process.returncode}")
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=1):
+                return
+        except OSError:
+            time.sleep(0.2)
+    raise TimeoutError(f"Nothing listening on port {port} after {timeout}s")
+
+
+def start_mongod(binary, workdir, log):
+    port = free_port()
+    dbpath = os.path.join(workdir, "db")
+    os.makedirs(dbpath)
+    process = subprocess.Popen(
+        [binary, "--dbpath", dbpath, "--port", str(port), "--bind_ip", "127.0.0.1"],
+        stdout=log, stderr=subprocess.STDOUT
+    )
+    wait_for_port(port, process, timeout=60)
+    return process, f"mongodb://127.0.0.1:{port}/?tls=false"
+
+
+def start_api(mongo_uri, log):
+    port = free_port()
+    env = dict(os.environ, MONGO_URI=mongo_uri)
+    env.setdefault("JWT_SECRET_KEY", "load-benchmark-secret")
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "api:app", "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"],
+        cwd=REPO_ROOT, env=env, stdout=log, stderr=subprocess.STDOUT
+    )
+    return process, port
+
+
+def stop(process, sig=signal.SIGTERM, timeout=30):
+    if process is None or process.poll() is not None:
+        return
+    process.send_signal(sig)
+    try:
+        process.wait(timeout)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        process.wait()
+
+
+# Minimal keep-alive HTTP/1.1 client (no third-party dependency)
+
+class HTTPConnection:
+    def __init__(self, port, host="127.0.0.1"):
+        self.host = host
+        self.port = port
+        self._reader = None
+        self._writer = None
+
+    async def request(self, method, path, body=b"", headers=None):
+        """Send one request and return (status, headers, body); reconnects as needed."""
+        if self._writer is None:
+            self._reader, self._writer = await asyncio.open_connection(self.host, self.port)
+        lines = [f"{method} {path} HTTP/1.1", f"Host: {self.host}:{self.port}", f"Content-Length: {len(body)}"]
+        lines.extend(f"{name}: {value}" for name, value in (headers or {}).items())
+        self._writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1") + body)
+        await self._writer.drain()
+
+        status_line = await self._reader.readuntil(b"\r\n")
+        status = int(status_line.split()[1])
+        response_headers = {}
+        while True:
+            line = await self._reader.readuntil(b"\r\n")
+            if line == b"\r\n":
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            response_headers[name.strip().lower()] = value.strip()
+
+        if status in (204, 304) or method == "HEAD":
+            content = b""
+        elif "content-length" in response_headers:
+            content = await self._reader.readexactly(int(response_headers["content-length"]))
+        elif response_headers.get("transfer-encoding", "").lower() == "chunked":
+            chunks = []
+            while True:
+                size = int((await self._reader.readuntil(b"\r\n")).split(b";")[0], 16)
+                if size == 0:
+                    await self._reader.readuntil(b"\r\n")
+                    break
+                chunks.append(await self._reader.readexactly(size))
+                await self._reader.readexactly(2)
+            content = b"".join(chunks)
+        else:
+            content = await self._reader.read()
+            response_headers["connection"] = "close"
+
+        if response_headers.get("connection", "").lower() == "close":
+            self.close()
+        return status, response_headers, content
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+        self._reader = self._writer = None
+
+
+def multipart(files):
+    """Encode [(filename, content_type, bytes)] as a multipart body with field name `files`."""
+    boundary = uuid.uuid4().hex
+    parts = []
+    for filename, content_type, content in files:
+        parts.append(
+            f'--{boundary}\r\nContent-Disposition: form-data; name="files"; filename="{filename}"\r\n'
+            f"Content-Type: {content_type}\r\n\r\n".encode("latin-1") + content + b"\r\n"
+        )
+    parts.append(f"--{boundary}--\r\n".encode("latin-1"))
+    return b"".join(parts), f"multipart/form-data; boundary={boundary}"
+
+
+def json_request(payload, token=None):
+    headers = {"Content-Type": "application/json"}
+    if token:
+        headers["Authorization"] = f"Bearer {token}"
+    return json.dumps(payload).encode("utf-8"), headers
+
+
+def auth(token):
+    return {"Authorization": f"Bearer {token}"}
+
+
+# Synthetic uploads
+
+def unique_jpeg(content, n):
+    """Same picture, different bytes: a JPEG comment segment right after SOI defeats the result cache."""
+    comment = f"load-benchmark {n}".encode("ascii")
+    return content[:2] + b"\xff\xfe" + struct.pack(">H", len(comment) + 2) + comment + content[2:]
+
+
+def unique_mp4(content, n):
+    """Same video, different bytes: a trailing top-level `free` box is ignored by demuxers."""
+    return content + struct.pack(">I", 16) + b"free" + struct.pack(">Q", n)
+
+
+class LoadContext:
+    def __init__(self, users, images, videos, repeat_uploads):
+        self.users = users
+        self.images = images
+        self.videos = videos
+        self.repeat_uploads = repeat_uploads
+        self.etags = {}
+        self._sequence = itertools.count()
+
+    def next_id(self):
+        return next(self._sequence)
+
+    def image_upload(self, rng):
+        content = rng.choice(self.images)
+        return content if self.repeat_uploads else unique_jpeg(content, self.next_id())
+
+    def video_upload(self, rng):
+        content = rng.choice(self.videos)
+        return content if self.repeat_uploads else unique_mp4(content, self.next_id())
+
+
+# Workload: each operation returns the response status
+
+async def op_register(conn, ctx, rng):
+    n = ctx.next_id()
+    body, headers = json_request({
+        "username": f"loadbench_new_{n}_{rng.randrange(10**9)}",
+        "email": f"loadbench-new-{n}-{rng.randrange(10**9)}@example.com",
+        "password": PASSWORD,
+    })
+    status, _, _ = await conn.request("POST", "/api/users/register", body, headers)
+    return status
+
+
+async def op_login(conn, ctx, rng):
+    user = rng.choice(ctx.users)
+    body, headers = json_request({"email": user["email"], "password": PASSWORD})
+    status, _, content = await conn.request("POST", "/api/users/login", body, headers)
+    if status == 200:
+        user["token"] = json.loads(content)["access_token"]
+    return status
+
+
+async def op_questions(conn, ctx, rng):
+    user = rng.choice(ctx.users)
+    headers = auth(user["token"])
+    # Returning clients revalidate the copy they already have
+    etag = ctx.etags.get(user["email"])
+    if etag:
+        headers["If-None-Match"] = etag
+    status, response_headers, _ = await conn.request("GET", "/api/cognitive/questions", headers=headers)
+    if "etag" in response_headers:
+        ctx.etags[user["email"]] = response_headers["etag"]
+    return status
+
+
+async def op_submit(conn, ctx, rng):
+    user = rng.choice(ctx.users)
+    body, headers = json_request({"questions_data": make_answers(rng)}, user["token"])
+    status, _, _ = await conn.request("POST", "/api/cognitive/submit", body, headers)
+    return status
+
+
+async def op_emotion_image(conn, ctx, rng):
+    user = rng.choice(ctx.users)
+    body, content_type = multipart([("face.jpg", "image/jpeg", ctx.image_upload(rng))])
+    headers = dict(auth(user["token"]), **{"Content-Type": content_type})
+    status, _, _ = await conn.request("POST", "/api/emotion/analysis", body, headers)
+    return status
+
+
+async def op_emotion_video(conn, ctx, rng):
+    user = rng.choice(ctx.users)
+    body, content_type = multipart([("clip.mp4", "video/mp4", ctx.video_upload(rng))])
+    headers = dict(auth(user["token"]), **{"Content-Type": content_type})
+    status, _, _ = await conn.request("POST", "/api/emotion/analysis", body, headers)
+    return status
+
+
+async def op_status(conn, ctx, rng):
+    user = rng.choice(ctx.users)
+    status, _, _ = await conn.request("GET", "/api/emotion/status?limit=50", headers=auth(user["token"]))
+    return status
+
+
+async def op_dashboard(conn, ctx, rng):
+    user = rng.choice(ctx.users)
+    status, _, _ = await conn.request("GET", f"/api/dashboard?email={user['email']}")
+    return status
+
+
+OPERATIONS = {
+    "register": op_register,
+    "login": op_login,
+    "questions": op_questions,
+    "submit": op_submit,
+    "emotion_image": op_emotion_image,
+    "emotion_video": op_emotion_video,
+    "status": op_status,
+    "dashboard": op_dashboard,
+}
+
+
+def parse_mix(text):
+    weights = {}
+    for item in text.split(","):
+        name, _, weight = item.partition("=")
+        name = name.strip()
+        if name not in OPERATIONS:
+            raise ValueError(f"Unknown operation {name!r}; choose from {', '.join(OPERATIONS)}")
+        weights[name] = float(weight)
+    return weights
+
+
+async def wait_until_ready(port, process, timeout):
+    """Wait for /ready, which includes loading and warming up the emotion model."""
+    wait_for_port(port, process, timeout)
+    conn = HTTPConnection(port)
+    deadline = time.monotonic() + timeout
+    try:
+        while time.monotonic() < deadline:
+            if process.poll() is not None:
+                raise RuntimeError(f"API exited with code {process.returncode}")
+            status, _, content = await conn.request("GET", "/ready")
+            if status == 200:
+                return json.loads(content)
+            await asyncio.sleep(1)
+    finally:
+        conn.close()
+    raise TimeoutError(f"API not ready after {timeout}s")
+
+
+async def register_users(port, count, concurrency):
+    """Create the user population through the API; returns the users and the setup latencies."""
+    users = [
+        {"username": f"loadbench_{i}", "email": f"loadbench-{i}@example.com"}
+        for i in range(count)
+    ]
+    latencies = []
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def register(user):
+        async with semaphore:
+            conn = HTTPConnection(port)
+            try:
+                body, headers = json_request({"username": user["username"], "email": user["email"], "password": PASSWORD})
+                start = time.perf_counter()
+                status, _, content = await conn.request("POST", "/api/users/register", body, headers)
+                latencies.append((time.perf_counter() - start) * 1000)
+                if status != 200:
+                    raise RuntimeError(f"Registering {user['email']} failed with {status}: {content[:200]!r}")
+                user["token"] = json.loads(content)["access_token"]
+            finally:
+                conn.close()
+
+    await asyncio.gather(*(register(user) for user in users))
+    return users, latencies
+
+
+async def run_workload(port, ctx, weights, total, concurrency, seed):
+    latencies = defaultdict(list)
+    statuses = defaultdict(Counter)
+    names = list(weights)
+    issued = itertools.count()
+
+    async def worker(index):
+        rng = random.Random(seed * 1000 + index)
+        conn = HTTPConnection(port)
+        try:
+            while next(issued) < total:
+                name = rng.choices(names, [weights[n] for n in names])[0]
+                start = time.perf_counter()
+                try:
+                    outcome = await OPERATIONS[name](conn, ctx, rng)
+                except (OSError, asyncio.IncompleteReadError, asyncio.LimitOverrunError) as e:
+                    outcome = f"error:{type(e).__name__}"
+                    conn.close()
+                latencies[name].append((time.perf_counter() - start) * 1000)
+                statuses[name][str(outcome)] += 1
+        finally:
+            conn.close()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker(i) for i in range(concurrency)))
+    elapsed = time.perf_counter() - start
+
+    routes = {}
+    for name in names:
+        routes[name] = summarize(latencies[name], elapsed)
+        routes[name]["statuses"] = dict(statuses[name])
+    overall = summarize([value for values in latencies.values() for value in values], elapsed)
+    return {"elapsed_seconds": elapsed, "overall": overall, "routes": routes}
+
+
+def build_uploads(args, workdir):
+    rng = np.random.default_rng(args.seed)
+    if args.faces:
+        faces = load_faces(args.faces)
+    else:
+        faces = [synthetic_face(rng) for _ in range(args.image_variants)]
+    images = [encode_jpeg(face) for face in faces]
+    videos = []
+    for i, face in enumerate(faces[:args.video_variants]):
+        path = write_video(os.path.join(workdir, f"clip{i}.mp4"), face)
+        with open(path, "rb") as f:
+            videos.append(f.read())
+    return images, videos
+
+
+async def benchmark(args, workdir, logs):
+    mongod = None
+    api = None
+    try:
+        mongo_uri = args.mongo_uri
+        if mongo_uri is None:
+            binary = args.mongod or shutil.which("mongod")
+            if binary is None:
+                raise SystemExit("No mongod found on PATH; pass --mongod or --mongo-uri")
+            mongod, mongo_uri = start_mongod(binary, workdir, logs["mongod"])
+
+        # Seed the question set directly; users go through the API like real sign-ups
+        with MongoClient(mongo_uri) as client:
+            client[DATABASE]["test_data"].replace_one({"test_type": TEST_TYPE}, make_question_set(), upsert=True)
+
+        images, videos = build_uploads(args, workdir)
+
+        api, port = start_api(mongo_uri, logs["api"])
+        ready = await wait_until_ready(port, api, args.ready_timeout)
+        users, register_latencies = await register_users(port, args.users, args.concurrency)
+
+        ctx = LoadContext(users, images, videos, args.repeat_uploads)
+        workload = await run_workload(port, ctx, parse_mix(args.mix), args.requests, args.concurrency, args.seed)
+
+        conn = HTTPConnection(port)
+        try:
+            _, _, metrics = await conn.request("GET", "/metrics")
+        finally:
+            conn.close()
+
+        return {
+            "config": {
+                "requests": args.requests,
+                "concurrency": args.concurrency,
+                "users": args.users,
+                "mix": parse_mix(args.mix),
+                "seed": args.seed,
+                "uploads": "real" if args.faces else "synthetic",
+                "repeat_uploads": args.repeat_uploads,
+            },
+            "startup": ready.get("startup"),
+            "setup": {"register": summarize(register_latencies)},
+            **workload,
+        }, metrics.decode("utf-8")
+    finally:
+        # SIGINT lets uvicorn run the shutdown handlers
+        stop(api, signal.SIGINT)
+        stop(mongod)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the API against a local MongoDB")
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="comma separated operation=weight")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--mongo-uri", default=None, help="use this (throwaway!) database instead of starting mongod")
+    parser.add_argument("--mongod", default=None, help="mongod binary, defaults to the one on PATH")
+    parser.add_argument("--faces", default=None, help="directory of real face images to upload")
+    parser.add_argument("--image-variants", type=int, default=8)
+    parser.add_argument("--video-variants", type=int, default=2)
+    parser.add_argument("--repeat-uploads", action="store_true", help="send identical bytes so the result cache can hit")
+    parser.add_argument("--ready-timeout", type=float, default=300)
+    parser.add_argument("--output-dir", default="bench_results")
+    parser.add_argument("--baseline", default=None, help="earlier result file to compare p95 latencies against")
+    parser.add_argument("--tolerance", type=float, default=0.10)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="load-benchmark-")
+    os.makedirs(args.output_dir, exist_ok=True)
+    try:
+        with open(os.path.join(args.output_dir, "load-mongod.log"), "w") as mongod_log, \
+                open(os.path.join(args.output_dir, "load-api.log"), "w") as api_log:
+            results, metrics = asyncio.run(benchmark(args, workdir, {"mongod": mongod_log, "api": api_log}))
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    # Compare before writing, the baseline may be the -latest file about to be replaced
+    regressions = compare_to_baseline(results, args.baseline, tolerance=args.tolerance) if args.baseline else []
+    path = write_results(results, args.output_dir, "load")
+    with open(path[:-len(".json")] + ".prom", "w") as f:
+        f.write(metrics)
+
+    print(json.dumps(results, indent=2))
+    print(f"Results written to {path}")
+    for regression in regressions:
+        print(f"REGRESSION {regression['name']}: p95 {regression['baseline']:.1f}ms -> {regression['current']:.1f}ms ({regression['change']:+.0%})")
+    if regressions:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+# Backfill the emotion_rollups collection from emotion_analyses.
+#
+# usage: python services/RebuildEmotionRollups.py [--user-id <id>] [--batch-size 5000]
+# Existing rollups in scope are dropped first, then history is streamed in batches
+# and each batch is folded into $inc upserts. Run it while no analyses are being
+# written for the users in scope, or their new analyses may be counted twice.
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from db.mongo import DatabaseConnection
+from services.emotion_rollups import ROLLUP_COLLECTION, rollup_updates
+
+
+async def rebuild(user_id, batch_size):
+    db = DatabaseConnection.get_database()
+    scope = {"user_id": user_id} if user_id else {}
+
+    deleted = await db[ROLLUP_COLLECTION].delete_many(scope)
+    print(f"Removed {deleted.deleted_count} existing rollups")
+
+    processed = 0
+    start = time.perf_counter()
+    batch = []
+    cursor = db["emotion_analyses"].find(
+        scope, {"user_id": 1, "timestamp": 1, "scores": 1}
+    ).batch_size(batch_size)
+    async for analysis in cursor:
+        batch.append(analysis)
+        if len(batch) >= batch_size:
+            updates = rollup_updates(batch)
+            if updates:
+                await db[ROLLUP_COLLECTION].bulk_write(updates, ordered=False)
+            processed += len(batch)
+            batch = []
+            print(f"{processed} analyses folded ({processed / (time.perf_counter() - start):.0f}/s)")
+    if batch:
+        updates = rollup_updates(batch)
+        if updates:
+            await db[ROLLUP_COLLECTION].bulk_write(updates, ordered=False)
+        processed += len(batch)
+
+    print(f"✅ Rebuilt rollups from {processed} analyses in {time.perf_counter() - start:.1f}s")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Rebuild emotion trend rollups from history")
+    parser.add_argument("--user-id", default=None, help="only rebuild this user's rollups")
+    parser.add_argument("--batch-size", type=int, default=5000)
+    args = parser.parse_args()
+
+    await DatabaseConnection.connect()
+    try:
+        await rebuild(args.user_id, args.batch_size)
+    finally:
+        await DatabaseConnection.disconnect()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,89 @@
+# Re-score stored cognitive test results with a scoring rule version.
+#
+# usage: python services/RescoreCognitiveResults.py [--version v1] [--batch-size 2000] [--all] [--dry-run]
+# Streams cognitive_test_results in batches, scores each batch with one vectorized
+# call and writes the new generated_result back with unordered bulk updates.
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+from pymongo import UpdateOne
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from db.mongo import DatabaseConnection
+from services.cognitive_scoring import get_rules, CURRENT_RULE_VERSION
+
+
+async def flush(collection, rules, batch, dry_run):
+    """Score a batch of documents and write them back; returns (updated, failed)."""
+    valid, pairs = [], []
+    for doc in batch:
+        if not doc.get("questions_data"):
+            continue
+        try:
+            pairs.append((
+                [q["question_id"] for q in doc["questions_data"]],
+                [q["selected_answer"] for q in doc["questions_data"]],
+            ))
+        except (KeyError, TypeError):
+            # Malformed answers: skip the document rather than abort the run
+            continue
+        valid.append(doc)
+    failed = len(batch) - len(valid)
+    results = rules.score_batch(pairs)
+    if dry_run or not valid:
+        return len(valid), failed
+    await collection.bulk_write([
+        UpdateOne(
+            {"_id": doc["_id"]},
+            {"$set": {"generated_result": result, "scoring_version": rules.version}}
+        )
+        for doc, result in zip(valid, results)
+    ], ordered=False)
+    return len(valid), failed
+
+
+async def rescore(version, batch_size, include_current, dry_run):
+    rules = get_rules(version)
+    collection = DatabaseConnection.get_collection("cognitive_test_results")
+    query = {} if include_current else {"scoring_version": {"$ne": version}}
+
+    updated = failed = 0
+    start = time.perf_counter()
+    batch = []
+    cursor = collection.find(query, {"questions_data": 1}).batch_size(batch_size)
+    async for doc in cursor:
+        batch.append(doc)
+        if len(batch) >= batch_size:
+            done, bad = await flush(collection, rules, batch, dry_run)
+            updated, failed = updated + done, failed + bad
+            batch = []
+            print(f"{updated} re-scored, {failed} skipped ({updated / (time.perf_counter() - start):.0f}/s)")
+    if batch:
+        done, bad = await flush(collection, rules, batch, dry_run)
+        updated, failed = updated + done, failed + bad
+
+    elapsed = time.perf_counter() - start
+    print(f"✅ Re-scored {updated} results with rules {version} in {elapsed:.1f}s ({failed} without answers skipped)"
+          + (" [dry run]" if dry_run else ""))
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Re-score cognitive_test_results with a scoring rule version")
+    parser.add_argument("--version", default=CURRENT_RULE_VERSION)
+    parser.add_argument("--batch-size", type=int, default=2000)
+    parser.add_argument("--all", action="store_true", help="also re-score results already on this version")
+    parser.add_argument("--dry-run", action="store_true", help="score without writing")
+    args = parser.parse_args()
+
+    await DatabaseConnection.connect()
+    try:
+        await rescore(args.version, args.batch_size, args.all, args.dry_run)
+    finally:
+        await DatabaseConnection.disconnect()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
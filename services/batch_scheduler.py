@@ -0,0 +1,147 @@
+import os
+import queue
+import threading
+import time
+import logging
+from concurrent.futures import Future
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Flush a batch once it holds this many face crops...
+MAX_BATCH_SIZE = int(os.getenv("EMOTION_MAX_BATCH_SIZE", "64"))
+# ...or once the oldest crop in it has waited this long
+MAX_WAIT_MS = float(os.getenv("EMOTION_MAX_WAIT_MS", "5"))
+
+
+class MicroBatchScheduler:
+    """Collects face crops from concurrent requests and runs them through the model together.
+
+    Callers submit an (n, 48, 48, 1) float32 array and get back a Future that
+    resolves to the (n, 7) predictions for exactly those rows.
+    """
+
+    def __init__(self, predict_fn, max_batch_size=MAX_BATCH_SIZE, max_wait_ms=MAX_WAIT_MS):
+        self.predict_fn = predict_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self._queue = queue.Queue()
+        self._thread = None
+        self._stopped = threading.Event()
+        self._stats_lock = threading.Lock()
+        self._batches = 0
+        self._items = 0
+        self._max_batch = 0
+        self._last_batch = 0
+        self._batch_sizes = {}
+
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._stopped.clear()
+            self._thread = threading.Thread(target=self._run, name="emotion-batcher", daemon=True)
+            self._thread.start()
+            logger.info(f"Micro-batch scheduler started (max batch {self.max_batch_size}, max wait {self.max_wait * 1000:.1f} ms)")
+
+    def stop(self):
+        if self._thread is not None:
+            self._stopped.set()
+            self._thread.join()
+            self._thread = None
+            # Nothing will run the crops still queued; fail them so their callers don't wait forever
+            while True:
+                try:
+                    _, future = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                future.set_exception(RuntimeError("Micro-batch scheduler stopped"))
+            logger.info("Micro-batch scheduler stopped")
+
+    def submit(self, crops):
+        """Queue crops for inference and return a Future for their predictions."""
+        future = Future()
+        if len(crops) == 0:
+            future.set_result(np.empty((0, 7), dtype=np.float32))
+            return future
+        self.start()
+        self._queue.put((np.asarray(crops, dtype=np.float32), future))
+        return future
+
+    def predict(self, crops):
+        """Blocking helper: submit crops and wait for their predictions."""
+        return self.submit(crops).result()
+
+    def stats(self):
+        with self._stats_lock:
+            return {
+                "queue_depth": self._queue.qsize(),
+                "batches": self._batches,
+                "items": self._items,
+                "avg_batch_size": self._items / self._batches if self._batches else 0.0,
+                "max_batch_size_seen": self._max_batch,
+                "last_batch_size": self._last_batch,
+                "batch_size_histogram": dict(sorted(self._batch_sizes.items())),
+                "max_batch_size": self.max_batch_size,
+                "max_wait_ms": self.max_wait * 1000,
+            }
+
+    def _collect(self):
+        """Block until at least one request arrives, then gather more until full or timed out."""
+        while not self._stopped.is_set():
+            try:
+                first = self._queue.get(timeout=0.1)
+                break
+            except queue.Empty:
+                continue
+        else:
+            return []
+
+        pending = [first]
+        size = len(first[0])
+        deadline = time.monotonic() + self.max_wait
+        while size < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            pending.append(item)
+            size += len(item[0])
+        return pending
+
+    def _record(self, size):
+        # Bucket batch sizes by the next power of two to keep the histogram small
+        bucket = 1 << max(0, int(size - 1).bit_length())
+        with self._stats_lock:
+            self._batches += 1
+            self._items += size
+            self._last_batch = size
+            self._max_batch = max(self._max_batch, size)
+            self._batch_sizes[bucket] = self._batch_sizes.get(bucket, 0) + 1
+
+    def _run(self):
+        while not self._stopped.is_set():
+            pending = self._collect()
+            if not pending:
+                continue
+            try:
+                batch = np.ascontiguousarray(np.concatenate([crops for crops, _ in pending]))
+                outputs = []
+                for start in range(0, len(batch), self.max_batch_size):
+                    chunk = batch[start:start + self.max_batch_size]
+                    outputs.append(np.asarray(self.predict_fn(chunk)))
+                    self._record(len(chunk))
+                predictions = np.concatenate(outputs, axis=0)
+            except Exception as e:
+                logger.error(f"Error running batched inference: {str(e)}")
+                for _, future in pending:
+                    future.set_exception(e)
+                continue
+
+            # Fan the rows back out to each caller
+            offset = 0
+            for crops, future in pending:
+                future.set_result(predictions[offset:offset + len(crops)])
+                offset += len(crops)
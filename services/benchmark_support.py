@@ -0,0 +1,191 @@
+"""Shared pieces of the benchmark suite (services/LoadBenchmark.py, services/BenchmarkPipeline.py).
+
+Synthetic inputs are generated from a seed so runs are reproducible, and
+results are written as JSON together with the git commit and environment they
+were measured on, so two result files can be compared for regressions.
+"""
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from datetime import datetime
+
+import cv2
+import numpy as np
+
+ANSWERS = ["Never", "Rarely", "Sometimes", "Often", "Always"]
+QUESTION_COUNT = 18
+TEST_TYPE = "Cognitive Assessment"
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+# Synthetic data
+
+def make_question_set(test_type=TEST_TYPE, count=QUESTION_COUNT):
+    """A test_data document shaped like the real question set."""
+    return {
+        "test_type": test_type,
+        "questions": [
+            {"id": qid, "text": f"Synthetic question {qid}", "options": list(ANSWERS)}
+            for qid in range(1, count + 1)
+        ],
+    }
+
+
+def make_answers(rng, count=QUESTION_COUNT):
+    """questions_data for one submission, as the frontend posts it."""
+    return [
+        {"question_id": qid, "question_text": f"Synthetic question {qid}", "selected_answer": rng.choice(ANSWERS)}
+        for qid in range(1, count + 1)
+    ]
+
+
+def synthetic_face(rng, size=(480, 640)):
+    """Draw a frontal cartoon face (skin oval, brows, eyes, nose shadow, mouth) on a noisy background.
+
+    The cascade does not find a face in every variant; misses still cost a
+    decode and a full detection pass and answer 400. Use real photos (--faces)
+    when the inference share of the latency matters.
+    """
+    height, width = size
+    image = rng.integers(90, 140, size=(height, width, 3), dtype=np.uint8)
+    cx = int(width / 2 + rng.integers(-width // 8, width // 8))
+    cy = int(height / 2 + rng.integers(-height // 10, height // 10))
+    face_w = int(min(height, width) * rng.uniform(0.22, 0.32))
+    face_h = int(face_w * 1.3)
+    skin = tuple(int(c) for c in rng.integers(150, 220, size=3))
+    cv2.ellipse(image, (cx, cy), (face_w, face_h), 0, 0, 360, skin, -1)
+    eye_dx, eye_y = face_w // 2, cy - face_h // 5
+    for side in (-1, 1):
+        ex = cx + side * eye_dx
+        cv2.line(image, (ex - face_w // 4, eye_y - face_h // 6), (ex + face_w // 4, eye_y - face_h // 6), (40, 40, 40), max(2, face_w // 20))
+        cv2.ellipse(image, (ex, eye_y), (face_w // 5, face_h // 14), 0, 0, 360, (255, 255, 255), -1)
+        cv2.circle(image, (ex, eye_y), face_h // 16, (30, 30, 30), -1)
+    cv2.ellipse(image, (cx, cy + face_h // 10), (face_w // 8, face_h // 6), 0, 0, 360, tuple(int(c * 0.8) for c in skin), -1)
+    cv2.ellipse(image, (cx, cy + face_h // 2), (face_w // 2, face_h // 8), 0, 0, 180, (60, 40, 120), max(2, face_w // 15))
+    return cv2.GaussianBlur(image, (5, 5), 0)
+
+
+def encode_jpeg(image, quality=90):
+    ok, buffer = cv2.imencode(".jpg", image, [cv2.IMWRITE_JPEG_QUALITY, quality])
+    if not ok:
+        raise RuntimeError("Could not encode synthetic image")
+    return buffer.tobytes()
+
+
+def write_video(path, face, seconds=4, fps=25):
+    """Write an mp4 of `face` drifting slowly across the frame."""
+    height, width = face.shape[:2]
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"mp4v"), fps, (width, height))
+    try:
+        for i in range(int(seconds * fps)):
+            shift = np.float32([[1, 0, 10 * np.sin(i / fps)], [0, 1, 5 * np.cos(i / fps)]])
+            writer.write(cv2.warpAffine(face, shift, (width, height), borderMode=cv2.BORDER_REFLECT))
+    finally:
+        writer.release()
+    return path
+
+
+def load_faces(directory):
+    """Images from a directory of real face photos, for runs that need realistic detection rates."""
+    faces = []
+    for name in sorted(os.listdir(directory)):
+        image = cv2.imread(os.path.join(directory, name))
+        if image is not None:
+            faces.append(image)
+    if not faces:
+        raise ValueError(f"No readable images in {directory}")
+    return faces
+
+
+# Results
+
+def summarize(latencies_ms, elapsed_seconds=None):
+    """Count, percentiles and (given the wall time of the run) throughput of a list of latencies."""
+    if not latencies_ms:
+        return {"count": 0}
+    values = np.asarray(latencies_ms, dtype=np.float64)
+    summary = {
+        "count": int(len(values)),
+        "mean_ms": float(values.mean()),
+        "p50_ms": float(np.percentile(values, 50)),
+        "p95_ms": float(np.percentile(values, 95)),
+        "p99_ms": float(np.percentile(values, 99)),
+        "max_ms": float(values.max()),
+    }
+    if elapsed_seconds:
+        summary["throughput_per_second"] = len(values) / elapsed_seconds
+    return summary
+
+
+def time_calls(fn, repeats, warmup=1):
+    """Latencies in ms of `repeats` calls to fn() after `warmup` untimed calls."""
+    for _ in range(warmup):
+        fn()
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+
+def environment():
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "HEAD"], cwd=REPO_ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "git_commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "argv": sys.argv,
+        "measured_at": datetime.utcnow().isoformat() + "Z",
+    }
+
+
+def write_results(results, output_dir, name):
+    """Write results plus environment to output_dir/<name>-<timestamp>.json and <name>-latest.json."""
+    os.makedirs(output_dir, exist_ok=True)
+    document = {"benchmark": name, "environment": environment(), "results": results}
+    stamp = datetime.utcnow().strftime("%Y%m%dT%H%M%SZ")
+    paths = [os.path.join(output_dir, f"{name}-{stamp}.json"), os.path.join(output_dir, f"{name}-latest.json")]
+    for path in paths:
+        with open(path, "w") as f:
+            json.dump(document, f, indent=2)
+    return paths[0]
+
+
+def compare_to_baseline(results, baseline_path, metric="p95_ms", tolerance=0.10):
+    """Entries whose `metric` grew by more than `tolerance` relative to the baseline result file.
+
+    Both result trees are walked in parallel; every dict holding `metric` is compared.
+    """
+    with open(baseline_path) as f:
+        baseline = json.load(f)["results"]
+
+    regressions = []
+
+    def walk(current, previous, path):
+        if not isinstance(current, dict) or not isinstance(previous, dict):
+            return
+        if metric in current and metric in previous and previous[metric] > 0:
+            change = current[metric] / previous[metric] - 1
+            if change > tolerance:
+                regressions.append({
+                    "name": "/".join(path),
+                    "baseline": previous[metric],
+                    "current": current[metric],
+                    "change": change,
+                })
+        for key, value in current.items():
+            walk(value, previous.get(key), path + [key])
+
+    walk(results, baseline, [])
+    return regressions
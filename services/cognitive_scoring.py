@@ -0,0 +1,131 @@
+"""Table-driven cognitive test scoring.
+
+Each rule version describes the answer scale, which questions belong to which
+area, and the summary text. A version is compiled once into NumPy lookup arrays
+so a submission (or a whole batch of them) is scored with vectorized operations.
+"""
+import numpy as np
+
+SCORING_RULES = {
+    "v1": {
+        "answer_scale": {
+            "Never": 1,
+            "Rarely": 2,
+            "Sometimes": 3,
+            "Often": 4,
+            "Always": 5
+        },
+        "max_answer_score": 5,
+        # Areas in summary order, with the question ids that feed them
+        "areas": [
+            ("Motivation", [1, 2, 5, 6], "Focus on enhancing your motivation, "),
+            ("Enthusiasm", [3, 4, 9, 10], "boosting your enthusiasm, "),
+            ("Stress Management", [7, 8, 16], "improving your stress management skills, "),
+            ("Social Connection", [12, 13, 17], "strengthening your social connections, "),
+            ("Emotional Balance", [14, 15, 18], "and balancing your emotions more effectively. "),
+        ],
+        "summary_intro": "Your overall performance on this cognitive assessment shows strong potential, with notable areas for improvement. ",
+        "summary_outro": "Keep working on these areas to further enhance your cognitive well-being.",
+    },
+}
+
+CURRENT_RULE_VERSION = "v1"
+
+
+class CompiledRules:
+    """Lookup arrays for one rule version."""
+
+    def __init__(self, version, rules):
+        self.version = version
+        self.answers = list(rules["answer_scale"])
+        self.answer_index = {answer: i for i, answer in enumerate(self.answers)}
+        # Last slot scores unknown answers as 0
+        self.answer_scores = np.array([rules["answer_scale"][a] for a in self.answers] + [0], dtype=np.int64)
+        self.max_answer_score = rules["max_answer_score"]
+
+        self.area_names = [name for name, _, _ in rules["areas"]]
+        self.area_phrases = [phrase for _, _, phrase in rules["areas"]]
+        max_question_id = max(qid for _, qids, _ in rules["areas"] for qid in qids)
+        # question id -> area index, -1 for questions outside every area; first listed area wins
+        self.question_area = np.full(max_question_id + 1, -1, dtype=np.int64)
+        for area_idx, (_, qids, _) in reversed(list(enumerate(rules["areas"]))):
+            self.question_area[qids] = area_idx
+
+        self.summary_intro = rules["summary_intro"]
+        self.summary_outro = rules["summary_outro"]
+
+    def encode_answers(self, answers):
+        unknown = len(self.answers)
+        return np.fromiter((self.answer_index.get(a, unknown) for a in answers), dtype=np.int64, count=len(answers))
+
+    def areas_for(self, question_ids):
+        ids = np.asarray(question_ids, dtype=np.int64)
+        in_range = (ids >= 0) & (ids < len(self.question_area))
+        areas = np.full(len(ids), -1, dtype=np.int64)
+        areas[in_range] = self.question_area[ids[in_range]]
+        return areas
+
+    def summary(self, area_present):
+        text = self.summary_intro + "".join(
+            phrase for phrase, present in zip(self.area_phrases, area_present) if present
+        )
+        # Trim the trailing comma and space, then finish the sentence
+        return text.rstrip(", ") + self.summary_outro
+
+    def score_batch(self, submissions):
+        """Score many submissions at once.
+
+        `submissions` is a list of (question_ids, selected_answers) pairs.
+        Returns one generated_result dict per submission, or raises ValueError
+        if any submission is empty.
+        """
+        lengths = np.array([len(ids) for ids, _ in submissions], dtype=np.int64)
+        if len(submissions) == 0:
+            return []
+        if (lengths == 0).any():
+            raise ValueError("Submission has no answered questions")
+
+        question_ids = [qid for ids, _ in submissions for qid in ids]
+        answers = [answer for _, submission_answers in submissions for answer in submission_answers]
+        owner = np.repeat(np.arange(len(submissions)), lengths)
+
+        scores = self.answer_scores[self.encode_answers(answers)]
+        totals = np.bincount(owner, weights=scores, minlength=len(submissions)).astype(np.int64)
+        percentages = totals / (lengths * self.max_answer_score) * 100
+
+        # (submission, area) presence matrix
+        areas = self.areas_for(question_ids)
+        mapped = areas >= 0
+        presence = np.zeros((len(submissions), len(self.area_names)), dtype=bool)
+        presence[owner[mapped], areas[mapped]] = True
+
+        results = []
+        offsets = np.concatenate([[0], np.cumsum(lengths)])
+        for i in range(len(submissions)):
+            start, end = offsets[i], offsets[i + 1]
+            results.append({
+                "total_score": int(totals[i]),
+                "percentage_score": float(percentages[i]),
+                "test_summary": self.summary(presence[i]),
+                "areas_of_improvement": [name for name, present in zip(self.area_names, presence[i]) if present],
+                "detailed_scores": [
+                    {"question_id": qid, "selected_option": answer, "score": int(score)}
+                    for qid, answer, score in zip(question_ids[start:end], answers[start:end], scores[start:end])
+                ],
+            })
+        return results
+
+    def score(self, question_ids, answers):
+        return self.score_batch([(question_ids, answers)])[0]
+
+
+_compiled = {}
+
+
+def get_rules(version=CURRENT_RULE_VERSION):
+    """Compiled rules for a version, built on first use."""
+    if version not in _compiled:
+        if version not in SCORING_RULES:
+            raise ValueError(f"Unknown scoring rule version: {version}")
+        _compiled[version] = CompiledRules(version, SCORING_RULES[version])
+    return _compiled[version]
@@ -0,0 +1,72 @@
+"""Per-user daily and weekly emotion rollups.
+
+Each rollup document holds running sums of the analysis `scores`, the number of
+analyses, and how often each emotion was dominant for one user and one bucket.
+They are updated with $inc upserts, so recording an analysis is a single bulk
+write and trend queries never have to scan emotion_analyses.
+"""
+from datetime import timedelta
+
+from pymongo import UpdateOne
+
+ROLLUP_COLLECTION = "emotion_rollups"
+PERIODS = ("day", "week")
+
+
+def bucket_start(timestamp, period):
+    day = timestamp.replace(hour=0, minute=0, second=0, microsecond=0)
+    if period == "week":
+        # Weeks start on Monday
+        return day - timedelta(days=day.weekday())
+    return day
+
+
+def rollup_increments(analyses):
+    """Fold analysis documents into {(user_id, period, bucket_start): $inc document}."""
+    increments = {}
+    for analysis in analyses:
+        scores = analysis.get("scores") or {}
+        if not scores:
+            continue
+        dominant = max(scores, key=scores.get)
+        for period in PERIODS:
+            key = (analysis["user_id"], period, bucket_start(analysis["timestamp"], period))
+            inc = increments.setdefault(key, {"count": 0})
+            inc["count"] += 1
+            for emotion, score in scores.items():
+                inc[f"score_sums.{emotion}"] = inc.get(f"score_sums.{emotion}", 0.0) + float(score)
+            inc[f"dominant_counts.{dominant}"] = inc.get(f"dominant_counts.{dominant}", 0) + 1
+    return increments
+
+
+def rollup_updates(analyses):
+    """Upsert operations applying the increments of the given analyses."""
+    return [
+        UpdateOne(
+            {"_id": f"{user_id}:{period}:{start.date().isoformat()}"},
+            {
+                "$inc": inc,
+                "$setOnInsert": {"user_id": user_id, "period": period, "bucket_start": start},
+            },
+            upsert=True
+        )
+        for (user_id, period, start), inc in rollup_increments(analyses).items()
+    ]
+
+
+async def record_analysis(db, analysis):
+    """Add one freshly inserted analysis to its day and week rollups."""
+    updates = rollup_updates([analysis])
+    if updates:
+        await db[ROLLUP_COLLECTION].bulk_write(updates, ordered=False)
+
+
+def rollup_to_trend(doc):
+    count = doc["count"]
+    return {
+        "period": doc["period"],
+        "bucket_start": doc["bucket_start"],
+        "analyses": count,
+        "average_scores": {emotion: total / count for emotion, total in doc.get("score_sums", {}).items()},
+        "dominant_counts": doc.get("dominant_counts", {}),
+    }
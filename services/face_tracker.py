@@ -0,0 +1,80 @@
+import cv2
+import numpy as np
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def detect_downscaled(cascade, gray, max_width):
+    """Run the Haar cascade on a copy of gray shrunk to max_width and map boxes back to full resolution."""
+    height, width = gray.shape[:2]
+    scale = min(1.0, max_width / float(width)) if max_width else 1.0
+    if scale < 1.0:
+        small = cv2.resize(gray, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+    else:
+        small = gray
+    faces = cascade.detectMultiScale(small, 1.1, 4)
+    if len(faces) == 0:
+        return []
+    boxes = np.round(np.asarray(faces, dtype=np.float32) / scale).astype(int)
+    # Keep boxes inside the frame after rounding
+    boxes[:, 2] = np.minimum(boxes[:, 2], width - boxes[:, 0])
+    boxes[:, 3] = np.minimum(boxes[:, 3], height - boxes[:, 1])
+    return [tuple(box) for box in boxes]
+
+
+class FaceTracker:
+    """Follows faces across consecutive sampled frames of one video.
+
+    A full-frame (downscaled) cascade pass runs on keyframes. In between, each
+    previously found face is only searched for in a window around its last box.
+    If any face is lost there, the tracker falls back to a full pass on the same frame.
+    """
+
+    def __init__(self, cascade, keyframe_interval=5, max_width=640, roi_margin=0.5):
+        self.cascade = cascade
+        self.keyframe_interval = max(1, keyframe_interval)
+        self.max_width = max_width
+        self.roi_margin = roi_margin
+        self.boxes = []
+        self._since_keyframe = 0
+        self.full_detections = 0
+        self.roi_detections = 0
+
+    def _full_detect(self, gray):
+        self.full_detections += 1
+        self._since_keyframe = 0
+        self.boxes = detect_downscaled(self.cascade, gray, self.max_width)
+        return self.boxes
+
+    def _track(self, gray, box):
+        """Look for a face near box; returns the new box or None."""
+        x, y, w, h = box
+        height, width = gray.shape[:2]
+        mx, my = int(w * self.roi_margin), int(h * self.roi_margin)
+        x0, y0 = max(0, x - mx), max(0, y - my)
+        x1, y1 = min(width, x + w + mx), min(height, y + h + my)
+        roi = gray[y0:y1, x0:x1]
+        faces = self.cascade.detectMultiScale(roi, 1.1, 4, minSize=(max(1, w // 2), max(1, h // 2)))
+        if len(faces) == 0:
+            return None
+        fx, fy, fw, fh = max(faces, key=lambda f: f[2] * f[3])
+        return (x0 + fx, y0 + fy, fw, fh)
+
+    def detect(self, gray):
+        """Return face boxes (x, y, w, h) for the next frame, in full-resolution coordinates."""
+        if not self.boxes or self._since_keyframe >= self.keyframe_interval - 1:
+            return self._full_detect(gray)
+
+        tracked = []
+        for box in self.boxes:
+            new_box = self._track(gray, box)
+            if new_box is None:
+                # Tracking confidence dropped: re-detect on the whole frame
+                return self._full_detect(gray)
+            tracked.append(new_box)
+        # Only frames where every face was tracked count as saved full passes
+        self.roi_detections += 1
+        self._since_keyframe += 1
+        self.boxes = tracked
+        return tracked
@@ -0,0 +1,51 @@
+import cv2
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def _sampling_step(cap, num_frames, interval_seconds):
+    """Work out how many frames to skip between samples."""
+    fps = cap.get(cv2.CAP_PROP_FPS) or 0
+    if interval_seconds is not None and fps > 0:
+        return max(1, int(round(fps * interval_seconds)))
+
+    # CAP_PROP_FRAME_COUNT is only an estimate (often wrong for .mov/.avi), so it just sets the spacing;
+    # the loop below never relies on it to know where the video ends
+    total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    if total_frames > 0:
+        return max(1, total_frames // num_frames)
+    if fps > 0:
+        # Unknown length: fall back to roughly one sample per second
+        return max(1, int(round(fps)))
+    return 1
+
+
+def sample_frames(video_path, num_frames=10, interval_seconds=None):
+    """Sample up to num_frames frames from a video in a single forward decode pass.
+
+    By default the samples are spread evenly over the (reported) frame count;
+    pass interval_seconds to take one frame every interval_seconds instead.
+    Every frame is grab()bed but only the sampled ones are retrieve()d (decoded),
+    and decoding stops as soon as num_frames frames have been collected.
+    """
+    frames = []
+    cap = cv2.VideoCapture(video_path)
+    try:
+        if not cap.isOpened():
+            logger.error(f"Could not open video: {video_path}")
+            return frames
+
+        step = _sampling_step(cap, num_frames, interval_seconds)
+        index = 0
+        while len(frames) < num_frames:
+            if not cap.grab():
+                break
+            if index % step == 0:
+                ret, frame = cap.retrieve()
+                if ret:
+                    frames.append(frame)
+            index += 1
+    finally:
+        cap.release()
+    return frames
@@ -0,0 +1,92 @@
+import asyncio
+import contextvars
+import os
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+# Number of threads that run OpenCV decoding, face detection and model inference
+INFERENCE_WORKERS = int(os.getenv("INFERENCE_WORKERS", "2"))
+# Maximum number of jobs (running + waiting) before new work is rejected
+INFERENCE_QUEUE_SIZE = int(os.getenv("INFERENCE_QUEUE_SIZE", "16"))
+
+
+class InferenceQueueFull(Exception):
+    """Raised when the inference executor already holds INFERENCE_QUEUE_SIZE jobs."""
+
+
+class InferenceExecutor:
+    """Runs blocking emotion-pipeline work off the event loop on a bounded thread pool."""
+
+    def __init__(self, max_workers=INFERENCE_WORKERS, max_queue=INFERENCE_QUEUE_SIZE):
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        # Called once in every worker thread as it starts, to set up per-thread state
+        self.thread_initializer = None
+        self._executor = None
+        self._pending = 0
+
+    def _init_thread(self):
+        try:
+            self.thread_initializer()
+        except Exception as e:
+            # A raising initializer would break the whole pool; the work itself will report the problem
+            logger.error(f"Error initializing inference thread: {str(e)}")
+
+    def start(self):
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.max_workers,
+                thread_name_prefix="inference",
+                initializer=self._init_thread if self.thread_initializer is not None else None
+            )
+            logger.info(f"Inference executor started with {self.max_workers} workers")
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+            logger.info("Inference executor stopped")
+
+    def prime(self, func, timeout=60):
+        """Blocking: run func() once on every worker thread, starting all of them.
+
+        Each call waits on a barrier until max_workers calls are running, which
+        forces the pool to spread them over distinct threads.
+        """
+        self.start()
+        barrier = threading.Barrier(self.max_workers)
+
+        def task():
+            func()
+            try:
+                barrier.wait(timeout)
+            except threading.BrokenBarrierError:
+                pass
+
+        for future in [self._executor.submit(task) for _ in range(self.max_workers)]:
+            future.result()
+
+    @property
+    def pending(self):
+        return self._pending
+
+    async def run(self, func, *args):
+        """Run func(*args) on the pool and await its result."""
+        # The counter is only touched from the event loop thread, so no lock is needed
+        if self._pending >= self.max_queue:
+            raise InferenceQueueFull(f"Inference queue is full ({self.max_queue} jobs)")
+        self.start()
+        self._pending += 1
+        try:
+            loop = asyncio.get_running_loop()
+            # Carry the caller's context so per-request stage timings recorded in the thread reach it
+            context = contextvars.copy_context()
+            return await loop.run_in_executor(self._executor, context.run, func, *args)
+        finally:
+            self._pending -= 1
+
+
+inference_executor = InferenceExecutor()
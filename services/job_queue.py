@@ -0,0 +1,127 @@
+import asyncio
+import os
+import logging
+from datetime import datetime, timedelta
+
+logger = logging.getLogger(__name__)
+
+# Number of background tasks that process queued jobs in this process
+JOB_WORKERS = int(os.getenv("EMOTION_JOB_WORKERS", "1"))
+# Running jobs whose heartbeat is older than this are assumed orphaned by a dead worker
+JOB_STALE_SECONDS = int(os.getenv("EMOTION_JOB_STALE_SEC", "300"))
+# How often every process re-checks the collection for queued and stale running jobs
+JOB_SWEEP_SECONDS = int(os.getenv("EMOTION_JOB_SWEEP_SEC", "60"))
+
+
+class JobQueue:
+    """In-process job queue whose state lives in a Mongo collection.
+
+    Job documents carry a status of queued -> running -> done / failed. Workers
+    claim jobs atomically with find_one_and_update, so several processes can
+    share the collection and a job is only ever processed once. On start and then
+    every JOB_SWEEP_SECONDS, queued jobs and stale running jobs (left behind by a
+    recycled or killed process) are picked up again; a job already claimed
+    elsewhere is simply skipped.
+    `on_finished(job)` is awaited once a job is done or failed (never when it is
+    interrupted by a shutdown), e.g. to release the job's input files.
+    """
+
+    def __init__(self, collection_name, handler, get_collection, workers=JOB_WORKERS, on_finished=None):
+        self.collection_name = collection_name
+        self.handler = handler
+        self.get_collection = get_collection
+        self.on_finished = on_finished
+        self.workers = workers
+        self._queue = None
+        self._queued_ids = set()
+        self._tasks = []
+
+    @property
+    def collection(self):
+        return self.get_collection(self.collection_name)
+
+    async def create(self, doc):
+        """Persist a new queued job and schedule it; returns its id."""
+        now = datetime.utcnow()
+        doc.update({"status": "queued", "created_at": now, "updated_at": now})
+        job_id = (await self.collection.insert_one(doc)).inserted_id
+        self.enqueue(job_id)
+        return job_id
+
+    def enqueue(self, job_id):
+        if self._queue is None:
+            raise RuntimeError("Job queue is not started")
+        if job_id in self._queued_ids:
+            return
+        self._queued_ids.add(job_id)
+        self._queue.put_nowait(job_id)
+
+    async def start(self):
+        if self._queue is not None:
+            return
+        self._queue = asyncio.Queue()
+        await self._recover()
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        self._tasks.append(asyncio.create_task(self._sweep()))
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self._queue = None
+        self._queued_ids = set()
+
+    async def _recover(self):
+        """Requeue stale running jobs and schedule every queued job not already waiting here."""
+        stale_before = datetime.utcnow() - timedelta(seconds=JOB_STALE_SECONDS)
+        result = await self.collection.update_many(
+            {"status": "running", "updated_at": {"$lt": stale_before}},
+            {"$set": {"status": "queued", "updated_at": datetime.utcnow()}}
+        )
+        if result.modified_count:
+            logger.warning(f"Requeued {result.modified_count} stale running jobs in {self.collection_name}")
+        waiting = len(self._queued_ids)
+        async for doc in self.collection.find({"status": "queued"}, {"_id": 1}).sort("created_at", 1):
+            self.enqueue(doc["_id"])
+        if len(self._queued_ids) > waiting:
+            logger.info(f"Recovered {len(self._queued_ids) - waiting} queued jobs from {self.collection_name}")
+
+    async def _sweep(self):
+        while True:
+            await asyncio.sleep(JOB_SWEEP_SECONDS)
+            try:
+                await self._recover()
+            except Exception as e:
+                logger.error(f"Sweep of {self.collection_name} failed: {str(e)}")
+
+    async def update(self, job_id, fields):
+        fields["updated_at"] = datetime.utcnow()
+        await self.collection.update_one({"_id": job_id}, {"$set": fields})
+
+    async def _worker(self):
+        while True:
+            job_id = await self._queue.get()
+            self._queued_ids.discard(job_id)
+            # Atomically claim the job so no other worker or process runs it too
+            job = await self.collection.find_one_and_update(
+                {"_id": job_id, "status": "queued"},
+                {"$set": {"status": "running", "started_at": datetime.utcnow(), "updated_at": datetime.utcnow()}}
+            )
+            if job is None:
+                continue
+            try:
+                result = await self.handler(job)
+                await self.update(job_id, {"status": "done", "finished_at": datetime.utcnow(), **(result or {})})
+            except asyncio.CancelledError:
+                # Shutting down: leave the job for the next start to pick up
+                await self.update(job_id, {"status": "queued"})
+                raise
+            except Exception as e:
+                logger.error(f"Job {job_id} failed: {str(e)}")
+                await self.update(job_id, {"status": "failed", "error": str(e), "finished_at": datetime.utcnow()})
+            if self.on_finished is not None:
+                try:
+                    await self.on_finished(job)
+                except Exception as e:
+                    logger.error(f"Cleanup of job {job_id} failed: {str(e)}")
@@ -0,0 +1,28 @@
+import orjson
+from bson import ObjectId
+from fastapi.responses import JSONResponse
+
+# NumPy scalars/arrays and datetimes are handled natively by orjson; dict keys may be non-strings
+ORJSON_OPTIONS = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+
+
+def _default(obj):
+    if isinstance(obj, ObjectId):
+        return str(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def dumps(content):
+    """Serialize Mongo documents (ObjectId, datetime) and NumPy values to JSON bytes in one pass."""
+    return orjson.dumps(content, default=_default, option=ORJSON_OPTIONS)
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse rendered with orjson.
+
+    Return it directly from a handler (rather than returning a dict) so FastAPI
+    skips its jsonable_encoder pass and raw Mongo documents can be passed as-is.
+    """
+
+    def render(self, content):
+        return dumps(content)
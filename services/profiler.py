@@ -0,0 +1,87 @@
+"""Stdlib sampling profiler for single requests.
+
+A background thread snapshots every thread's stack with sys._current_frames()
+at a fixed interval and counts identical stacks. The result is written in the
+collapsed-stack format (`frame;frame;frame count` per line) that flamegraph.pl
+and speedscope load directly. Requests hop between the event loop thread and
+the inference / bcrypt pools, so all threads are sampled; stacks of concurrent
+requests show up too and are labelled by thread name.
+"""
+import os
+import sys
+import tempfile
+import threading
+import uuid
+from collections import Counter
+
+PROFILE_DIR = os.getenv("PROFILE_DIR", os.path.join(tempfile.gettempdir(), "request_profiles"))
+PROFILE_INTERVAL_SECONDS = float(os.getenv("PROFILE_INTERVAL_MS", "5")) / 1000
+# Oldest profiles are deleted once more than this many are stored
+PROFILE_KEEP = int(os.getenv("PROFILE_KEEP", "50"))
+PROFILE_SUFFIX = ".folded"
+
+
+class SamplingProfiler:
+    def __init__(self, interval=PROFILE_INTERVAL_SECONDS):
+        self.interval = interval
+        self.samples = Counter()
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="request-profiler", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+        return self
+
+    def _run(self):
+        own_id = threading.get_ident()
+        while not self._stopped.wait(self.interval):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+                    frame = frame.f_back
+                stack.append(names.get(thread_id, str(thread_id)))
+                self.samples[";".join(reversed(stack))] += 1
+
+    def collapsed(self):
+        return "".join(f"{stack} {count}\n" for stack, count in self.samples.most_common())
+
+
+def new_profile_id():
+    return uuid.uuid4().hex
+
+
+def profile_path(profile_id):
+    """Path of a stored profile, or None for ids that are not ours (keeps lookups inside PROFILE_DIR)."""
+    try:
+        uuid.UUID(hex=profile_id)
+    except ValueError:
+        return None
+    return os.path.join(PROFILE_DIR, profile_id + PROFILE_SUFFIX)
+
+
+def save_profile(profile_id, profiler):
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    with open(profile_path(profile_id), "w") as f:
+        f.write(profiler.collapsed())
+
+    stored = sorted(
+        (entry for entry in os.scandir(PROFILE_DIR) if entry.name.endswith(PROFILE_SUFFIX)),
+        key=lambda entry: entry.stat().st_mtime
+    )
+    for entry in stored[:-PROFILE_KEEP]:
+        try:
+            os.remove(entry.path)
+        except OSError:
+            pass
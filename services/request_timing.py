@@ -0,0 +1,113 @@
+"""Per-request stage timings, reported in the Server-Timing response header.
+
+Code that wants its cost visible wraps the work in `stage(name)`. Durations go
+into a dict held in a context variable that RequestTimingMiddleware creates for
+each request; the inference executor copies the context into its threads, so
+stages timed there land in the same dict. Repeated stages (one detect per video
+frame) are summed.
+
+The middleware also runs the opt-in profiler: admins add `X-Profile: 1` or
+`?profile=1` to a request to get a sampling profile of it, whose id comes back
+in `X-Profile-Id` and which is downloadable from /api/profiles/{id}.
+"""
+import asyncio
+import logging
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from urllib.parse import parse_qs
+
+from fastapi import HTTPException
+
+from security import decode_token, is_admin
+from services.profiler import SamplingProfiler, new_profile_id, save_profile
+
+logger = logging.getLogger(__name__)
+
+_timings = ContextVar("request_timings", default=None)
+
+PROFILE_FLAG_VALUES = ("1", "true", "yes")
+
+
+@contextmanager
+def stage(name, histogram=None):
+    """Time a block as stage `name` of the current request, and in `histogram` (labelled stage=name) when given."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        timings = _timings.get()
+        if timings is not None:
+            timings[name] = timings.get(name, 0.0) + elapsed
+        if histogram is not None:
+            histogram.observe(elapsed, stage=name)
+
+
+def server_timing_header(timings, total):
+    metrics = [f"{name};dur={seconds * 1000:.1f}" for name, seconds in timings.items()]
+    metrics.append(f"total;dur={total * 1000:.1f}")
+    return ", ".join(metrics)
+
+
+def _profile_requested(scope, headers):
+    if headers.get(b"x-profile", b"").decode("latin-1").lower() in PROFILE_FLAG_VALUES:
+        return True
+    query = parse_qs(scope.get("query_string", b"").decode("latin-1"))
+    return query.get("profile", [""])[0].lower() in PROFILE_FLAG_VALUES
+
+
+def _requested_by_admin(headers):
+    scheme, _, token = headers.get(b"authorization", b"").decode("latin-1").partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return False
+    try:
+        return is_admin(decode_token(token).get("sub"))
+    except HTTPException:
+        return False
+
+
+class RequestTimingMiddleware:
+    """ASGI middleware adding Server-Timing to every response and profiling admin requests on demand."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        timings = {}
+        token = _timings.set(timings)
+        headers = dict(scope["headers"])
+        profiler = None
+        profile_id = None
+        # Checked from the token alone, so non-admins can't make the server sample stacks
+        if _profile_requested(scope, headers) and _requested_by_admin(headers):
+            profile_id = new_profile_id()
+            profiler = SamplingProfiler().start()
+
+        start = time.perf_counter()
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                response_headers = list(message.get("headers", []))
+                response_headers.append(
+                    (b"server-timing", server_timing_header(timings, time.perf_counter() - start).encode("latin-1"))
+                )
+                if profile_id is not None:
+                    response_headers.append((b"x-profile-id", profile_id.encode("latin-1")))
+                message = dict(message, headers=response_headers)
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _timings.reset(token)
+            if profiler is not None:
+                profiler.stop()
+                try:
+                    await asyncio.get_running_loop().run_in_executor(None, save_profile, profile_id, profiler)
+                except OSError as e:
+                    logger.error(f"Error saving profile {profile_id}: {str(e)}")
@@ -0,0 +1,96 @@
+import os
+import threading
+import logging
+from collections import OrderedDict
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+# Number of per-file results kept in process
+RESULT_CACHE_SIZE = int(os.getenv("EMOTION_CACHE_SIZE", "1024"))
+# Set to "true" to also persist results in the emotion_result_cache collection
+RESULT_CACHE_PERSIST = os.getenv("EMOTION_CACHE_PERSIST", "false").lower() in ("1", "true", "yes")
+RESULT_CACHE_COLLECTION = "emotion_result_cache"
+# Persisted results are dropped by a TTL index this long after they were written
+RESULT_CACHE_TTL_SECONDS = int(os.getenv("EMOTION_CACHE_TTL_SEC", str(7 * 24 * 3600)))
+
+
+class ResultCache:
+    """Two-tier cache of per-file emotion results keyed by content hash + model version.
+
+    The first tier is a bounded in-process LRU; the optional second tier is a
+    Mongo collection shared by all workers. A persistent hit is promoted into the LRU.
+    """
+
+    def __init__(self, max_size=RESULT_CACHE_SIZE, persist=RESULT_CACHE_PERSIST, get_collection=None):
+        self.max_size = max_size
+        self.persist = persist and get_collection is not None
+        self._get_collection = get_collection
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.memory_hits = 0
+        self.persistent_hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(content_hash, model_version):
+        return f"{model_version}:{content_hash}"
+
+    async def get(self, key):
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.memory_hits += 1
+                return self._entries[key]
+
+        if self.persist:
+            try:
+                doc = await self._get_collection(RESULT_CACHE_COLLECTION).find_one({"_id": key})
+            except Exception as e:
+                logger.error(f"Error reading emotion result cache: {str(e)}")
+                doc = None
+            if doc is not None:
+                self._remember(key, doc["scores"])
+                with self._lock:
+                    self.persistent_hits += 1
+                return doc["scores"]
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    async def set(self, key, scores):
+        self._remember(key, scores)
+        if self.persist:
+            try:
+                await self._get_collection(RESULT_CACHE_COLLECTION).replace_one(
+                    {"_id": key},
+                    {"_id": key, "scores": scores, "created_at": datetime.utcnow()},
+                    upsert=True
+                )
+            except Exception as e:
+                logger.error(f"Error writing emotion result cache: {str(e)}")
+
+    def _remember(self, key, scores):
+        with self._lock:
+            self._entries[key] = scores
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.memory_hits + self.persistent_hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "persistent": self.persist,
+                "memory_hits": self.memory_hits,
+                "persistent_hits": self.persistent_hits,
+                "misses": self.misses,
+                "hit_rate": (self.memory_hits + self.persistent_hits) / lookups if lookups else 0.0,
+            }
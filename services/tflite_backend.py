@@ -0,0 +1,66 @@
+import numpy as np
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def _load_interpreter_class():
+    # Prefer the lightweight runtime; fall back to the one bundled with TensorFlow
+    try:
+        from tflite_runtime.interpreter import Interpreter
+    except ImportError:
+        import tensorflow as tf
+        Interpreter = tf.lite.Interpreter
+    return Interpreter
+
+
+class TFLiteEmotionModel:
+    """Serves an exported emotion model through the TFLite interpreter.
+
+    Mirrors the part of the Keras model API the app uses (predict_on_batch), and
+    transparently quantizes inputs / dequantizes outputs for int8 models.
+    The interpreter is not thread-safe, so only call it from one thread at a time
+    (the micro-batch scheduler already guarantees this).
+    """
+
+    def __init__(self, model_path, num_threads=None, model_content=None):
+        Interpreter = _load_interpreter_class()
+        self.model_path = model_path
+        if model_content is not None:
+            # Serve from an in-memory flatbuffer, e.g. one a pre-fork parent shares with its workers
+            self.interpreter = Interpreter(model_content=model_content, num_threads=num_threads)
+        else:
+            self.interpreter = Interpreter(model_path=model_path, num_threads=num_threads)
+        self.interpreter.allocate_tensors()
+        self._input = self.interpreter.get_input_details()[0]
+        self._output = self.interpreter.get_output_details()[0]
+        self._batch_size = int(self._input["shape"][0])
+        logger.info(f"TFLite emotion model loaded from {model_path} (input dtype {self._input['dtype'].__name__})")
+
+    def _resize(self, batch_size):
+        if batch_size == self._batch_size:
+            return
+        self.interpreter.resize_tensor_input(self._input["index"], [batch_size, 48, 48, 1])
+        self.interpreter.allocate_tensors()
+        self._input = self.interpreter.get_input_details()[0]
+        self._output = self.interpreter.get_output_details()[0]
+        self._batch_size = batch_size
+
+    def predict_on_batch(self, batch):
+        batch = np.asarray(batch, dtype=np.float32)
+        self._resize(len(batch))
+
+        input_dtype = self._input["dtype"]
+        if input_dtype != np.float32:
+            scale, zero_point = self._input["quantization"]
+            limits = np.iinfo(input_dtype)
+            batch = np.clip(np.round(batch / scale + zero_point), limits.min, limits.max).astype(input_dtype)
+
+        self.interpreter.set_tensor(self._input["index"], batch)
+        self.interpreter.invoke()
+        output = self.interpreter.get_tensor(self._output["index"])
+
+        if self._output["dtype"] != np.float32:
+            scale, zero_point = self._output["quantization"]
+            output = (output.astype(np.float32) - zero_point) * scale
+        return output